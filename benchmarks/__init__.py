@@ -0,0 +1,5 @@
+"""
+Benchmarks for the hot paths of ops-lib-osm
+
+Run all of them with: python -m benchmarks --output results.json
+"""
@@ -0,0 +1,53 @@
+"""
+Run the benchmarks and write their results as JSON
+
+Run with: python -m benchmarks [--size small|large] [--output results.json] [suite ...]
+"""
+
+import argparse
+import sys
+
+from . import build, builders, hashing, pod, relations, validator
+from .common import print_results, report, SIZES
+
+SUITES = {
+    "build": build,
+    "builders": builders,
+    "hashing": hashing,
+    "pod": pod,
+    "relations": relations,
+    "validator": validator,
+}
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument(
+        "suites", nargs="*", metavar="suite", help=f"One of {', '.join(SUITES)}"
+    )
+    parser.add_argument("--size", choices=SIZES, action="append")
+    parser.add_argument("--output", help="JSON file to write the results to")
+    parser.add_argument(
+        "--quiet", action="store_true", help="Do not print the results table"
+    )
+    options = parser.parse_args(args)
+    for suite in options.suites:
+        if suite not in SUITES:
+            parser.error(f"unknown suite: {suite}")
+
+    results = []
+    for suite in options.suites or SUITES:
+        for size in options.size or SIZES:
+            suite_results = SUITES[suite].benchmarks(size)
+            if not options.quiet:
+                print_results(suite_results)
+            results.extend(suite_results)
+    if options.output:
+        with open(options.output, "w") as f:
+            report(results, f)
+    elif options.quiet:
+        report(results, sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Cost of building OSM sized pod specs
+
+Run with: python -m benchmarks.build
+"""
+
+from opslib.osm.pod import (
+    ContainerV3Builder,
+    FilesV3Builder,
+    IngressResourceV3Builder,
+    PodRestartPolicy,
+    PodSpecV3Builder,
+)
+
+from .common import measure, print_results
+
+PARAMS = {
+    "small": {"containers": 1, "files": 2, "file_size": 1024, "secrets": 2},
+    "large": {"containers": 4, "files": 20, "file_size": 64 * 1024, "secrets": 50},
+}
+
+IMAGE_INFO = {
+    "imagePath": "opensourcemano/nbi:latest",
+    "username": "username",
+    "password": "password",
+}
+
+
+def osm_pod_spec_builder(
+    containers: int, files: int, file_size: int, secrets: int
+) -> PodSpecV3Builder:
+    """
+    Get a pod spec builder with the parts found in the OSM charms
+
+    :param: containers: Number of containers
+    :param: files: Number of files mounted in every container
+    :param: file_size: Size of every file, in bytes
+    :param: secrets: Number of secrets. All of them force a restart of the pod.
+    """
+    pod_spec_builder = PodSpecV3Builder(enable_security_context=True)
+    for c in range(containers):
+        files_builder = FilesV3Builder()
+        for f in range(files):
+            files_builder.add_file(f"config-{f}.yaml", f"{c}{f}".ljust(file_size, "x"))
+        container_builder = ContainerV3Builder(
+            f"container-{c}", IMAGE_INFO, run_as_non_root=True
+        )
+        container_builder.add_port(name="http", port=9999 + c)
+        container_builder.add_tcpsocket_readiness_probe(9999 + c)
+        container_builder.add_tcpsocket_liveness_probe(9999 + c)
+        container_builder.add_envs({f"OSM_ENV_{e}": f"value-{e}" for e in range(30)})
+        container_builder.add_volume_config(
+            "config", "/app/config", files_builder.build()
+        )
+        pod_spec_builder.add_container(container_builder.build())
+    for s in range(secrets):
+        pod_spec_builder.add_secret(f"secret-{s}", {"key": f"value-{s}"})
+    ingress_resource_builder = IngressResourceV3Builder(
+        "ingress", {"nginx.ingress.kubernetes.io/proxy-body-size": "15m"}
+    )
+    ingress_resource_builder.add_rule("osm.example.com", "nbi", 9999)
+    pod_spec_builder.add_ingress_resource(ingress_resource_builder.build())
+    restart_policy = PodRestartPolicy()
+    restart_policy.add_secrets()
+    pod_spec_builder.set_restart_policy(restart_policy)
+    return pod_spec_builder
+
+
+def benchmarks(size: str):
+    params = PARAMS[size]
+    pod_spec_builder = osm_pod_spec_builder(**params)
+    return [
+        measure(
+            "build.osm_pod_spec_builder",
+            lambda: osm_pod_spec_builder(**params),
+            params,
+            number=20,
+        ),
+        measure("build.pod_spec", pod_spec_builder.build, params, number=100),
+    ]
+
+
+if __name__ == "__main__":
+    for size in PARAMS:
+        print_results(benchmarks(size))
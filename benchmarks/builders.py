@@ -0,0 +1,91 @@
+"""
+Cost of filling the builders with many envs and files, and of building them
+
+Run with: python -m benchmarks.builders
+"""
+
+from opslib.osm.pod import ContainerV3Builder, FilesV3Builder
+from opslib.osm.utils import spec_hash
+
+from .common import measure, print_results
+
+PARAMS = {
+    "small": {"envs": 20, "files": 5},
+    "large": {"envs": 500, "files": 200},
+}
+
+
+class LegacyContainerV3Builder(ContainerV3Builder):
+    """ContainerV3Builder as it was before: add_envs copied the whole env dict"""
+
+    def add_envs(self, envs: dict):
+        self._envs = {**self._envs, **envs}
+
+
+def add_envs_one_by_one(builder_cls, envs: int):
+    container_builder = builder_cls("container", {"imagePath": "image"})
+    for i in range(envs):
+        container_builder.add_envs({f"OSM_ENV_{i}": f"value-{i}"})
+    return container_builder
+
+
+def add_envs_bulk(envs: int):
+    container_builder = ContainerV3Builder("container", {"imagePath": "image"})
+    container_builder.add_envs((f"OSM_ENV_{i}", f"value-{i}") for i in range(envs))
+    return container_builder
+
+
+def add_files_one_by_one(files: int):
+    files_builder = FilesV3Builder()
+    for i in range(files):
+        files_builder.add_file(f"file-{i}", f"content-{i}")
+    return files_builder
+
+
+def add_files_bulk(files: int):
+    files_builder = FilesV3Builder()
+    files_builder.add_files((f"file-{i}", f"content-{i}") for i in range(files))
+    return files_builder
+
+
+def build_and_hash(container_builder, rebuild: bool):
+    if rebuild:
+        container_builder.add_env("OSM_CHANGED", "value")
+    return spec_hash(container_builder.build())
+
+
+def benchmarks(size: str):
+    params = PARAMS[size]
+    envs, files = params["envs"], params["files"]
+    container_builder = add_envs_bulk(envs)
+    container_builder.add_ports((f"port-{i}", 8000 + i) for i in range(files))
+    return [
+        measure(
+            "builders.add_envs_legacy",
+            lambda: add_envs_one_by_one(LegacyContainerV3Builder, envs),
+            params,
+        ),
+        measure(
+            "builders.add_envs",
+            lambda: add_envs_one_by_one(ContainerV3Builder, envs),
+            params,
+        ),
+        measure("builders.add_envs_bulk", lambda: add_envs_bulk(envs), params),
+        measure("builders.add_file", lambda: add_files_one_by_one(files), params),
+        measure("builders.add_files", lambda: add_files_bulk(files), params),
+        measure(
+            "builders.container_build_hash",
+            lambda: build_and_hash(container_builder, rebuild=True),
+            params,
+        ),
+        measure(
+            "builders.container_build_hash_cached",
+            lambda: build_and_hash(container_builder, rebuild=False),
+            params,
+        ),
+    ]
+
+
+if __name__ == "__main__":
+    for size in PARAMS:
+        print_results(benchmarks(size))
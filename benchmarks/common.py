@@ -0,0 +1,73 @@
+"""Measurement and reporting helpers shared by the benchmarks"""
+
+import json
+import platform
+import statistics
+import sys
+import timeit
+from typing import Any, Callable, Dict, List
+
+# Input sizes of every benchmark: "small" is a typical OSM charm, "large" a stressed one
+SIZES = ("small", "large")
+
+
+def measure(
+    name: str,
+    function: Callable[[], Any],
+    params: Dict[str, Any] = None,
+    number: int = 100,
+    repeat: int = 5,
+) -> Dict[str, Any]:
+    """
+    Time a function
+
+    :param: name: Name of the benchmark
+    :param: function: Function to time, called without arguments
+    :param: params: Parameters of the inputs, recorded in the result
+    :param: number: Calls per repetition
+    :param: repeat: Repetitions; the best and the median are reported
+
+    :return: A JSON serializable result, with the timings in microseconds per call
+    """
+    timings = [
+        seconds / number * 1e6
+        for seconds in timeit.repeat(function, number=number, repeat=repeat)
+    ]
+    return {
+        "name": name,
+        "params": params or {},
+        "number": number,
+        "repeat": repeat,
+        "best_us": round(min(timings), 3),
+        "median_us": round(statistics.median(timings), 3),
+    }
+
+
+def report(results: List[Dict[str, Any]], output=None):
+    """
+    Write the results as JSON, along with the environment they were taken in
+
+    :param: results: Results returned by measure
+    :param: output: File object to write to. Default: stdout
+    """
+    json.dump(
+        {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "results": results,
+        },
+        output or sys.stdout,
+        indent=2,
+    )
+    (output or sys.stdout).write("\n")
+
+
+def print_results(results: List[Dict[str, Any]]):
+    """Print the results in a human readable table"""
+    for result in results:
+        params = ", ".join(f"{key}={value}" for key, value in result["params"].items())
+        print(
+            f"{result['name']:<40} {params:<48} "
+            f"best {result['best_us']:>12.1f} us  median {result['median_us']:>12.1f} us"
+        )
@@ -0,0 +1,34 @@
+"""
+Cost of hashing OSM sized pod specs
+
+Run with: python -m benchmarks.hashing
+"""
+
+from opslib.osm.utils import hash_from_dict, spec_hash, thaw
+
+from .build import osm_pod_spec_builder, PARAMS
+from .common import measure, print_results
+
+
+def benchmarks(size: str):
+    params = PARAMS[size]
+    pod_spec = osm_pod_spec_builder(**params).build()
+    plain_pod_spec = thaw(pod_spec)
+    return [
+        measure(
+            "hashing.hash_from_dict",
+            lambda: hash_from_dict(plain_pod_spec),
+            params,
+            number=20,
+        ),
+        measure(
+            "hashing.spec_hash", lambda: spec_hash(plain_pod_spec), params, number=20
+        ),
+        # The digests of the frozen fragments are cached after the first call
+        measure("hashing.spec_hash_frozen", lambda: spec_hash(pod_spec), params),
+    ]
+
+
+if __name__ == "__main__":
+    for size in PARAMS:
+        print_results(benchmarks(size))
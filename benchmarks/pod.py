@@ -0,0 +1,91 @@
+"""
+Cost of the restart policy hash on pod specs with many secrets
+
+Run with: python -m benchmarks.pod
+"""
+
+import timeit
+
+from opslib.osm.pod import PodRestartPolicy, PodSpecV3Builder
+from opslib.osm.utils import hash_from_dict
+
+from .common import measure
+
+PARAMS = {
+    "small": {"secrets": 10},
+    "large": {"secrets": 500},
+}
+
+
+def legacy_find_in_list_with_key(list, key, value):
+    """find_in_list_with_key as it was before: a full scan for every lookup"""
+    found_item = None
+    for item in list:
+        if key in item and item[key] == value:
+            found_item = item
+    return found_item
+
+
+def legacy_policy_hash(restart_policy, pod_spec):
+    """PodRestartPolicy.policy_hash as it was before the resources were indexed"""
+    policy_spec = {"kubernetesResources": {}}
+    for resource_type, resource_names in restart_policy.default_policy[
+        "kubernetesResources"
+    ].items():
+        resources = pod_spec["kubernetesResources"][resource_type]
+        if resource_names is True:
+            policy_spec["kubernetesResources"][resource_type] = resources
+        elif resource_names is not False:
+            resources_found = []
+            for name in resource_names:
+                resource = legacy_find_in_list_with_key(resources, "name", name)
+                if resource:
+                    resources_found.append(resource)
+            if resources_found:
+                policy_spec["kubernetesResources"][resource_type] = resources_found
+    return hash_from_dict(policy_spec)
+
+
+def pod_spec_with_secrets(secrets: int):
+    pod_spec_builder = PodSpecV3Builder()
+    for i in range(secrets):
+        pod_spec_builder.add_secret(f"secret-{i}", {"key": f"value-{i}"})
+    restart_policy = PodRestartPolicy()
+    restart_policy.add_secrets(secret_names=[f"secret-{i}" for i in range(secrets)])
+    return pod_spec_builder.pod_spec, restart_policy
+
+
+def run(secrets: int, number: int = 200):
+    pod_spec, restart_policy = pod_spec_with_secrets(secrets)
+    results = {}
+    for name, function in (
+        ("legacy", lambda: legacy_policy_hash(restart_policy, pod_spec)),
+        ("indexed", lambda: restart_policy.policy_hash(pod_spec)),
+    ):
+        results[name] = timeit.timeit(function, number=number) / number * 1e6
+    return results
+
+
+def benchmarks(size: str):
+    params = PARAMS[size]
+    pod_spec, restart_policy = pod_spec_with_secrets(**params)
+    return [
+        measure(
+            "pod.policy_hash_legacy",
+            lambda: legacy_policy_hash(restart_policy, pod_spec),
+            params,
+        ),
+        measure(
+            "pod.policy_hash", lambda: restart_policy.policy_hash(pod_spec), params
+        ),
+    ]
+
+
+if __name__ == "__main__":
+    for secrets in (10, 100, 500):
+        results = run(secrets)
+        print(
+            f"{secrets} secrets: legacy {results['legacy']:.1f} us/hash, "
+            f"indexed {results['indexed']:.1f} us/hash "
+            f"({results['legacy'] / results['indexed']:.1f}x)"
+        )
@@ -0,0 +1,149 @@
+"""
+Cost of reading relation data through the relation clients
+
+Run with: python -m benchmarks.relations
+"""
+
+import functools
+import time
+
+from ops.charm import CharmBase
+from ops.testing import Harness
+from opslib.osm.interfaces.common import RelationPrefetcher
+from opslib.osm.interfaces.keystone import KeystoneClient
+from opslib.osm.interfaces.mysql import MysqlClient
+
+from .common import measure, print_results
+
+PARAMS = {
+    "small": {"units": 1},
+    "large": {"units": 20},
+}
+
+# Simulated duration of a relation-get hook tool call, in seconds
+HOOK_TOOL_LATENCY = 0.002
+
+METADATA = """
+name: benchmark
+requires:
+  keystone:
+    interface: keystone
+  mysql:
+    interface: mysql
+"""
+
+MYSQL_DATA = {
+    "host": "mysql",
+    "port": "3306",
+    "user": "user",
+    "password": "password",
+    "root_password": "root_password",
+}
+
+
+class ClientsCharm(CharmBase):
+    prefetch = False
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        if self.prefetch:
+            self.relation_prefetcher = RelationPrefetcher(self)
+        self.keystone_client = KeystoneClient(self, "keystone")
+        self.mysql_client = MysqlClient(self, "mysql")
+
+
+class PrefetchClientsCharm(ClientsCharm):
+    prefetch = True
+
+
+def clients_harness(units: int, charm_class=ClientsCharm) -> Harness:
+    """Get a started Harness with keystone and mysql relations with all their data"""
+    harness = Harness(charm_class, meta=METADATA)
+    harness.begin()
+    relation_id = harness.add_relation("keystone", "keystone")
+    for unit in range(units):
+        harness.add_relation_unit(relation_id, f"keystone/{unit}")
+    harness.update_relation_data(
+        relation_id,
+        "keystone",
+        {field: f"{field}-value" for field in KeystoneClient.mandatory_fields},
+    )
+    relation_id = harness.add_relation("mysql", "mysql")
+    for unit in range(units):
+        harness.add_relation_unit(relation_id, f"mysql/{unit}")
+        harness.update_relation_data(relation_id, f"mysql/{unit}", MYSQL_DATA)
+    return harness
+
+
+def read_all_fields(charm: ClientsCharm):
+    for client in (charm.keystone_client, charm.mysql_client):
+        client.is_missing_data_in_app()
+        client.is_missing_data_in_unit()
+        for field in client.mandatory_fields:
+            getattr(client, field)
+
+
+def new_hook(harness: Harness):
+    """Forget everything read from the relations, as if a new hook started"""
+    for relation_name in ("keystone", "mysql"):
+        harness.charm.model.relations._invalidate(relation_name)
+    for client in (harness.charm.keystone_client, harness.charm.mysql_client):
+        client._update_relation()
+        client.invalidate_snapshot()
+
+
+def add_hook_tool_latency(harness: Harness):
+    relation_get = harness._backend.relation_get
+
+    @functools.wraps(relation_get)
+    def slow_relation_get(*args, **kwargs):
+        time.sleep(HOOK_TOOL_LATENCY)
+        return relation_get(*args, **kwargs)
+
+    harness._backend.relation_get = slow_relation_get
+
+
+def benchmarks(size: str):
+    params = PARAMS[size]
+    results = []
+    harness = clients_harness(**params)
+    charm = harness.charm
+
+    def cold():
+        new_hook(harness)
+        read_all_fields(charm)
+
+    results.extend(
+        [
+            measure("relations.fields_cold", cold, params),
+            measure("relations.fields", lambda: read_all_fields(charm), params),
+        ]
+    )
+    for name, charm_class in (
+        ("relations.fields_cold_latency", ClientsCharm),
+        ("relations.fields_cold_latency_prefetch", PrefetchClientsCharm),
+    ):
+        latency_harness = clients_harness(params["units"], charm_class)
+        add_hook_tool_latency(latency_harness)
+
+        def cold_with_latency():
+            new_hook(latency_harness)
+            read_all_fields(latency_harness.charm)
+
+        results.append(
+            measure(
+                name,
+                cold_with_latency,
+                {**params, "latency_ms": HOOK_TOOL_LATENCY * 1000},
+                number=5,
+                repeat=3,
+            )
+        )
+        latency_harness.cleanup()
+    harness.cleanup()
+    return results
+
+
+if __name__ == "__main__":
+    for size in PARAMS:
+        print_results(benchmarks(size))
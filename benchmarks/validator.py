@@ -0,0 +1,145 @@
+"""
+Validation cost per model, before and after compiling the model schemas
+
+Run with: python -m benchmarks.validator
+"""
+
+import timeit
+from typing import Dict, List, Optional
+
+from opslib.osm.validator import (
+    _is_optional_type,
+    _safe_get_args,
+    _safe_get_type,
+    _validate,
+    AttributeError,
+    AttributeErrorTypes,
+    ModelValidator,
+    validate_batch,
+    validate_model,
+    ValidationError,
+    validator,
+)
+
+from .common import measure
+
+FIELDS = 40
+# Number of configs of the batch validation benchmark
+BATCH_SIZE = 1000
+
+PARAMS = {
+    "small": {"fields": 10},
+    "large": {"fields": 100},
+}
+
+
+def legacy_validate_model(model, data):
+    """validate_model as it was before the schemas were compiled"""
+    validation_exceptions = []
+    model_attributes = getattr(model, "__annotations__")
+    __decorator_validators__ = {
+        validator.argument: validator
+        for validator in model.__dict__.values()
+        if hasattr(validator, "decorator")
+    }
+    values = {}
+    for attr_name, attr_type in model_attributes.items():
+        optional = _is_optional_type(attr_type)
+        type_to_check = _safe_get_type(attr_type)
+        args_type = _safe_get_args(attr_type)
+        data_value = data.get(attr_name)
+        if data_value is None and not optional:
+            validation_exceptions.append(
+                AttributeError(attr_name, AttributeErrorTypes.MISSING)
+            )
+        else:
+            try:
+                _validate(data_value, type_to_check, args_type)
+                if attr_name in __decorator_validators__:
+                    data[attr_name] = __decorator_validators__[attr_name](data_value)
+            except Exception as e:
+                validation_exceptions.append(AttributeError(attr_name, str(e)))
+    if validation_exceptions:
+        return values, ValidationError(exceptions=validation_exceptions)
+    values.update({attr_name: data.get(attr_name) for attr_name in model_attributes})
+    return values, None
+
+
+def wide_model(fields: int = FIELDS):
+    """Create a config model with a mix of plain, optional and generic fields"""
+    annotations = {}
+    data = {}
+    for i in range(fields):
+        kind = i % 5
+        if kind == 0:
+            annotations[f"string_{i}"] = str
+            data[f"string_{i}"] = "value"
+        elif kind == 1:
+            annotations[f"integer_{i}"] = Optional[int]
+            data[f"integer_{i}"] = i
+        elif kind == 2:
+            annotations[f"boolean_{i}"] = Optional[bool]
+        elif kind == 3:
+            annotations[f"list_{i}"] = List[str]
+            data[f"list_{i}"] = ["a", "b", "c"]
+        else:
+            annotations[f"dict_{i}"] = Optional[Dict[str, str]]
+            data[f"dict_{i}"] = {"a": "1", "b": "2"}
+
+    @validator("string_0")
+    def validate_string_0(cls, v):
+        return v
+
+    model = type(
+        "WideModel",
+        (ModelValidator,),
+        {"__annotations__": annotations, "validate_string_0": validate_string_0},
+    )
+    return model, data
+
+
+def run(fields: int = FIELDS, number: int = 2000):
+    model, data = wide_model(fields)
+    results = {}
+    for name, function in (
+        ("legacy", legacy_validate_model),
+        ("compiled", validate_model),
+    ):
+        seconds = timeit.timeit(lambda: function(model, dict(data)), number=number)
+        results[name] = seconds / number * 1e6
+    return results
+
+
+def benchmarks(size: str):
+    params = PARAMS[size]
+    model, data = wide_model(**params)
+    return [
+        measure(
+            "validator.validate_model_legacy",
+            lambda: legacy_validate_model(model, dict(data)),
+            params,
+            number=1000,
+        ),
+        measure(
+            "validator.validate_model",
+            lambda: validate_model(model, dict(data)),
+            params,
+            number=1000,
+        ),
+        measure(
+            "validator.validate_batch",
+            lambda: validate_batch(model, [data] * BATCH_SIZE),
+            {**params, "configs": BATCH_SIZE},
+            number=5,
+        ),
+    ]
+
+
+if __name__ == "__main__":
+    for fields in (10, FIELDS, 100):
+        results = run(fields)
+        print(
+            f"{fields} fields: legacy {results['legacy']:.1f} us/model, "
+            f"compiled {results['compiled']:.1f} us/model "
+            f"({results['legacy'] / results['compiled']:.1f}x)"
+        )
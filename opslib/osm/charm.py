@@ -25,9 +25,20 @@ __all__ = ["CharmedOsmBase", "RelationsMissing"]
 
 import json
 import logging
-from string import Template
+import os
+from pathlib import Path
 import traceback
-from typing import Any, Dict, NoReturn
+from typing import (
+    Any,
+    Callable,
+    ContextManager,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    NoReturn,
+    Optional,
+)
 
 
 from oci_image import OCIImageResource, OCIImageResourceError
@@ -42,11 +53,41 @@ from ops.model import (
 
 
 from .config.mysql import MysqlModel
-from .utils import hash_from_dict
-from .validator import ValidationError
+from .diff import diff_pod_specs, flatten_pod_spec
+from .interfaces.common import RelationPrefetcher
+from .pod import PodSpecV3Builder
+from .profiling import ALLOCATIONS_SUFFIX, HookProfiler, parse_profile_modes
+from .sections import PodSpecSection, SECTION_KINDS, SectionCache
+from .sizing import (
+    check_pod_spec_size,
+    measure_pod_spec,
+    SizeBudget,
+)
+from .templates import render_template
+from .timing import HookTimer
+from .utils import freeze, hash_from_dict, spec_hash, SPEC_HASH_PREFIX, thaw
+from .validator import (
+    AttributeError as ValidationAttributeError,
+    schema_version,
+    validate_model,
+    ValidationError,
+)
 
 logger = logging.getLogger(__name__)
 
+# Number of hooks whose timings are kept
+TIMINGS_HISTORY_SIZE = 10
+# Action dumping the timings, if the charm declares it in actions.yaml
+TIMINGS_ACTION = "get-timings"
+# Environment variable enabling the profiling of the hooks: cpu, memory or all
+PROFILE_ENV = "OSM_CHARM_PROFILE"
+# Directory, in the charm directory, where the profiles are kept
+PROFILES_DIR = ".profiles"
+# Action listing the profiles, if the charm declares it in actions.yaml
+PROFILES_ACTION = "get-profiles"
+# Directory, in the charm directory, where the results of the sections are kept
+SECTIONS_DIR = ".sections"
+
 DEBUG_SCRIPT = r"""#!/bin/bash
 PUBLIC_KEY_CONTENT="$pubkey"
 DEBIAN_FRONTEND=noninteractive  apt update && apt install ssh -y
@@ -103,6 +144,12 @@ class CharmedOsmBase(CharmBase):
         oci_image: str = "image",
         vscode_workspace: Dict = {},
         mysql_uri: bool = False,
+        fast_reconcile: bool = True,
+        settle_pod_spec: bool = False,
+        timing: bool = False,
+        profile_option: Optional[str] = None,
+        size_budget: Optional[SizeBudget] = None,
+        prefetch_relations: bool = False,
     ) -> NoReturn:
         """
         CharmedOsmBase Charm constructor
@@ -110,43 +157,256 @@ class CharmedOsmBase(CharmBase):
         :params: oci_image: Resource name for main OCI image
         :params: vscode_workspace: VSCode workspace
         :params: mysql_uri: indicates whether the charm has mysql_uri config or not
+        :params: fast_reconcile: skip the pod spec assembly when the config, the relation
+                                 data, the image resource and the debug settings have not
+                                 changed since the last applied pod spec. Set it to False
+                                 if build_pod_spec depends on any other state.
+        :params: settle_pod_spec: assemble and apply the pod spec once per hook, just
+                                  before the framework commits, no matter how many
+                                  events called configure_pod during the hook.
+        :params: timing: measure the phases of the pod spec assembly, and the spans
+                         added by the charm with timing_span. The timings of every
+                         hook are logged at debug level, and the last ones are kept
+                         for the get-timings action.
+        :params: profile_option: config option enabling the profiling of the hooks,
+                                 like the OSM_CHARM_PROFILE environment variable does.
+                                 Its value is a comma separated list of modes (cpu,
+                                 memory) or "all". The profiles of the last hooks are
+                                 kept in the .profiles folder of the charm directory,
+                                 and listed by the get-profiles action.
+        :params: size_budget: size thresholds of the pod spec. A warning is logged for
+                              every part of the pod spec exceeding them.
+        :params: prefetch_relations: read the data of all the relations of the relation
+                                     clients concurrently, the first time any of it is
+                                     needed (see RelationPrefetcher). The relation
+                                     clients must be created after this constructor.
         """
         super().__init__(*args)
+        self.relation_prefetcher = (
+            RelationPrefetcher(self) if prefetch_relations else None
+        )
+        self.profiler = None
+        self._start_profiler(profile_option)
 
         # Internal state initialization
-        self.state.set_default(pod_spec=None)
+        self.state.set_default(
+            pod_spec=None,
+            pod_spec_inputs=None,
+            image_resource_path=None,
+            image_resource_signature=None,
+            image_info=None,
+            pod_spec_paths=None,
+            pod_spec_paths_key=None,
+            timings=[],
+            validated_configs={},
+            sections={},
+        )
 
+        self.oci_image = oci_image
         self.image = OCIImageResource(self, oci_image)
         self.debug_mode_enabled = False
         self.debug_pubkey = None
         self.vscode_workspace = vscode_workspace
         self.mysql_uri = mysql_uri
+        self.fast_reconcile = fast_reconcile
+        self.settle_pod_spec = settle_pod_spec
+        self._pod_spec_outdated = False
+        self.pod_spec_diff = None
+        self.timer = HookTimer(enabled=timing)
+        self.size_budget = size_budget
+        self._sections = {}
+        self.section_cache = SectionCache(Path(self.charm_dir) / SECTIONS_DIR)
+        # Names of the sections built, not reused, in the last pod spec assembly
+        self.rebuilt_sections = []
 
         # Registering regular events
         self.framework.observe(self.on.config_changed, self.configure_pod)
         self.framework.observe(self.on.leader_elected, self.configure_pod)
+        self.framework.observe(self.on.upgrade_charm, self._on_upgrade_charm)
+        self.framework.observe(self.framework.on.pre_commit, self._on_pre_commit)
+        self.framework.observe(self.framework.on.commit, self._on_commit)
+        if TIMINGS_ACTION in self.meta.actions:
+            self.framework.observe(
+                self.on[TIMINGS_ACTION].action, self._on_get_timings_action
+            )
+        if PROFILES_ACTION in self.meta.actions:
+            self.framework.observe(
+                self.on[PROFILES_ACTION].action, self._on_get_profiles_action
+            )
+
+    def get_missing_relations(self) -> List[str]:
+        """
+        Method that can be implemented by the charm to hold off the pod spec assembly
+
+        :return: Names of the mandatory relations whose data is still incomplete
+        """
+        return []
+
+    def timing_span(self, name: str) -> ContextManager:
+        """
+        Measure the time spent in a block of code, if timing is enabled
+
+        :params: name: Name of the span
+
+        Usage:
+            with self.timing_span("render-dashboard"):
+                ...
+        """
+        return self.timer.span(name)
 
     def build_pod_spec(self, image_info: Dict, **kwargs):
         """
         Method to be implemented by the charm to build the pod spec
 
+        Charms registering sections (see register_section) do not need to implement
+        it: by default, the pod spec is built from the sections.
+
         :params: image_info: Image info details
         :params: kwargs:
                     mysql_config (opslib.osm.config.mysql.MysqlModel):
                         Mysql config object. Will be included if the charm has been initialized
                         with mysql_uri=True.
         """
-        raise NotImplementedError("build_pod_spec is not implemented")
+        if not self._sections:
+            raise NotImplementedError("build_pod_spec is not implemented")
+        pod_spec_builder = PodSpecV3Builder()
+        self.build_sections(pod_spec_builder, image_info)
+        return pod_spec_builder.build()
+
+    def register_section(
+        self,
+        name: str,
+        kind: str,
+        build: Callable[[Dict[str, Any]], Any],
+        config: Iterable[str] = (),
+        relations: Optional[Mapping[str, Iterable[str]]] = None,
+        image: bool = False,
+        sections: Iterable[str] = (),
+        cache: bool = True,
+    ) -> NoReturn:
+        """
+        Register a section of the pod spec
+
+        The section is only built again when its inputs change; otherwise, the result
+        kept in the section cache, in the charm directory, is reused. Only the digest
+        of its inputs is kept in the stored state.
+        The sections are added to the pod spec in the order they are registered.
+
+        :params: name: Name of the section
+        :params: kind: Kind of section: container, ingress, secret, config_maps or
+                       files (see opslib.osm.sections.SECTION_KINDS)
+        :params: build: Function building the section (see PodSpecSection)
+        :params: config: Config keys the section depends on
+        :params: relations: Attribute names of the relation clients of the charm, and
+                            the fields of each one the section depends on
+        :params: image: Whether the section depends on the image info
+        :params: sections: Names of the sections, registered before, whose results
+                           the section depends on
+        :params: cache: Keep the result in the section cache. The cache is as private
+                        as the image resource file, whose registry credentials are
+                        also kept in the stored state (see image_info). Set it to
+                        False for results that must never be written to disk.
+        """
+        if kind not in SECTION_KINDS:
+            raise ValueError(f"unknown section kind: {kind}")
+        if name in self._sections:
+            raise ValueError(f"section {name} is already registered")
+        unknown = [section for section in sections if section not in self._sections]
+        if unknown:
+            raise ValueError(f"section {name} depends on unknown sections: {unknown}")
+        self._sections[name] = PodSpecSection(
+            name,
+            kind,
+            build,
+            tuple(config),
+            {client: tuple(fields) for client, fields in (relations or {}).items()},
+            image,
+            tuple(sections),
+            cache,
+        )
+
+    def _get_section_inputs(self, section: PodSpecSection, image_info: Dict):
+        inputs = {"config": {key: self.config.get(key) for key in section.config}}
+        inputs["relations"] = {}
+        for client_name, fields in section.relations.items():
+            snapshot = getattr(self, client_name).get_snapshot()
+            inputs["relations"][client_name] = {
+                field: snapshot.get_data_from_app(field)
+                or snapshot.get_data_from_unit(field)
+                for field in fields
+            }
+        if section.image:
+            inputs["image_info"] = image_info
+        return inputs
+
+    def build_sections(
+        self, pod_spec_builder: PodSpecV3Builder, image_info: Dict
+    ) -> Dict[str, Any]:
+        """
+        Add the registered sections to a pod spec builder
+
+        Only the sections whose inputs, or the sections they depend on, changed are
+        built; the results of the others are taken from the section cache.
+
+        :params: pod_spec_builder: Pod spec builder
+        :params: image_info: Image info details
+
+        :return: The result of every section
+        """
+        results = {}
+        digests = {}
+        self.rebuilt_sections = []
+        for section in self._sections.values():
+            inputs = self._get_section_inputs(section, image_info)
+            digests[section.name] = spec_hash(
+                [inputs, [digests[dependency] for dependency in section.sections]]
+            )
+            inputs["sections"] = {
+                dependency: results[dependency] for dependency in section.sections
+            }
+            results[section.name] = self._get_section_result(
+                section, inputs, digests[section.name]
+            )
+            SECTION_KINDS[section.kind](pod_spec_builder, results[section.name])
+        cached = {name for name, section in self._sections.items() if section.cache}
+        for name in set(self.state.sections) - cached:
+            del self.state.sections[name]
+            self.section_cache.discard([name])
+        if self.rebuilt_sections:
+            logger.debug(f"sections built: {', '.join(self.rebuilt_sections)}")
+        return results
+
+    def _get_section_result(
+        self, section: PodSpecSection, inputs: Dict[str, Any], digest: str
+    ) -> Any:
+        if section.cache and self.state.sections.get(section.name) == digest:
+            result = self.section_cache.get(section.name, digest)
+            if result is not None:
+                return result
+        with self.timer.span(f"section:{section.name}"):
+            result = freeze(section.build(inputs))
+        self.rebuilt_sections.append(section.name)
+        if not section.cache:
+            return result
+        if self.section_cache.put(section.name, digest, result):
+            self.state.sections[section.name] = digest
+        elif section.name in self.state.sections:
+            del self.state.sections[section.name]
+        return result
 
     def _get_hostpath_script(self) -> str:
         script = ""
         for module_name, hostpath_item in self.debug_hostpaths.items():
             hostpath_folder = hostpath_item["hostpath"]
             if hostpath_folder:
-                script += Template(HOSTPATH_SCRIPT_TEMPLATE).substitute(
-                    container_module_path=hostpath_item["container-path"],
-                    module_name=module_name,
-                    module_subfolder=hostpath_item["container-path"].split("/")[-1],
+                container_path = hostpath_item["container-path"]
+                script += render_template(
+                    HOSTPATH_SCRIPT_TEMPLATE,
+                    {
+                        "container_module_path": container_path,
+                        "module_name": module_name,
+                        "module_subfolder": container_path.split("/")[-1],
+                    },
                 )
         return script
 
@@ -190,15 +450,18 @@ class CharmedOsmBase(CharmBase):
                 "files": [
                     {
                         "path": "debug.sh",
-                        "content": Template(DEBUG_SCRIPT).substitute(
-                            pubkey=self.debug_pubkey,
-                            hostpath_script=hostpath_script,
-                            vscode_workspace=json.dumps(
-                                self.vscode_workspace,
-                                sort_keys=True,
-                                indent=4,
-                                separators=(",", ": "),
-                            ),
+                        "content": render_template(
+                            DEBUG_SCRIPT,
+                            {
+                                "pubkey": self.debug_pubkey,
+                                "hostpath_script": hostpath_script,
+                                "vscode_workspace": json.dumps(
+                                    self.vscode_workspace,
+                                    sort_keys=True,
+                                    indent=4,
+                                    separators=(",", ": "),
+                                ),
+                            },
                         ),
                         "mode": 0o777,
                     }
@@ -221,30 +484,285 @@ class CharmedOsmBase(CharmBase):
         """
         Debug the pod_spec if needed
 
-        :params: pod_spec: Pod Spec to be debugged.
+        :params: pod_spec: Pod Spec to be debugged. It is not modified.
+
+        :return: The pod spec, or a debugged copy of it
         """
         if self.debug_mode_enabled:
             if not self.debug_pubkey:
                 raise Exception("debug_pubkey config is not set")
+            pod_spec = thaw(pod_spec)
             self._debug(pod_spec)
+        return pod_spec
+
+    def _check_pod_spec_size(self, pod_spec: Dict[str, Any]) -> NoReturn:
+        """Log the size of the pod spec, and the parts exceeding the size budget"""
+        if not self.size_budget:
+            return
+        size = measure_pod_spec(pod_spec)
+        for warning in check_pod_spec_size(size, self.size_budget):
+            logger.warning(f"pod spec size: {warning}")
+        logger.debug(f"pod spec size: {size.summary()}")
 
     def _get_build_pod_spec_kwargs(self):
         """Get kwargs for the build_pod_spec function"""
         kwargs = {}
         if self.mysql_uri:
-            kwargs["mysql_config"] = MysqlModel(**self.config)
+            kwargs["mysql_config"] = self.validate_config(MysqlModel)
         return kwargs
 
+    def validate_config(self, model):
+        """
+        Validate the config with a model
+
+        The result, valid or not, is kept in the stored state. It is reused while the
+        config and the schema of the model are unchanged, so the config is validated
+        only once per change. Results of models whose validators return values that
+        cannot be stored are not kept. The model is created with model.construct, so
+        its __init__ is not called for reused results.
+
+        :params: model: ModelValidator subclass
+
+        :return: An instance of the model
+        :raises: ValidationError: if the config is not valid
+        """
+        config = {key.replace("-", "_"): value for key, value in self.config.items()}
+        config_digest = spec_hash([schema_version(model), config])
+        model_key = f"{model.__module__}.{model.__qualname__}"
+        stored = self.state.validated_configs.get(model_key)
+        if stored:
+            result = json.loads(stored)
+            if result["digest"] == config_digest:
+                if result["errors"]:
+                    raise ValidationError(
+                        [ValidationAttributeError(*e) for e in result["errors"]]
+                    )
+                return model.construct(**result["values"])
+        values, error = validate_model(model, config)
+        try:
+            self.state.validated_configs[model_key] = json.dumps(
+                {
+                    "digest": config_digest,
+                    "values": values,
+                    "errors": [[e.name, e.message] for e in error.exceptions]
+                    if error
+                    else None,
+                }
+            )
+        except TypeError:
+            logger.debug(f"{model_key} values cannot be stored, they are not cached")
+        if error:
+            raise error
+        return model.construct(**values)
+
+    def _get_image_resource_path(self) -> Optional[Path]:
+        """
+        Get the path of the OCI image resource file
+
+        The path is fetched once and stored, so the resource is not fetched again
+        until the charm is upgraded or a new resource is attached.
+        """
+        if self.oci_image not in self.meta.resources:
+            return None
+        if not self.state.image_resource_path:
+            try:
+                resource_path = self.model.resources.fetch(self.oci_image)
+            except ModelError:
+                return None
+            self.state.image_resource_path = str(resource_path)
+        return Path(self.state.image_resource_path)
+
+    def _get_image_resource_signature(self) -> Optional[Dict[str, Any]]:
+        """
+        Get the path, size and modification time of the OCI image resource file
+
+        :return: None if the resource is not declared or cannot be fetched
+        """
+        resource_path = self._get_image_resource_path()
+        if not resource_path:
+            return None
+        try:
+            resource_stat = resource_path.stat()
+        except OSError:
+            self.state.image_resource_path = None
+            return None
+        return {
+            "path": str(resource_path),
+            "size": resource_stat.st_size,
+            "mtime": resource_stat.st_mtime_ns,
+        }
+
+    @property
+    def image_info(self) -> Dict[str, str]:
+        """
+        Image info details of the OCI image resource
+
+        The resource file is only parsed when it changes. The result is stored
+        along with the signature of the file it was parsed from.
+        """
+        signature = self._get_image_resource_signature()
+        signature_hash = spec_hash(signature) if signature else None
+        if not signature_hash or signature_hash != self.state.image_resource_signature:
+            image_info = self.image.fetch()
+            if not signature_hash:
+                return image_info
+            self.state.image_info = image_info
+            self.state.image_resource_signature = signature_hash
+        return dict(self.state.image_info)
+
+    def _get_relations_data(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Get the data of the remote application and units of every relation"""
+        if self.relation_prefetcher:
+            self.relation_prefetcher.prefetch(self.meta.relations)
+            return {
+                relation_name: [
+                    {
+                        "app": dict(snapshot.app_data),
+                        "units": {
+                            unit_name: dict(unit_data)
+                            for unit_name, unit_data in snapshot.units_data.items()
+                        },
+                    }
+                    for _, snapshot in self.relation_prefetcher.get_snapshots(
+                        relation_name
+                    )
+                ]
+                for relation_name in self.meta.relations
+            }
+        relations_data = {}
+        for relation_name in self.meta.relations:
+            relations_data[relation_name] = [
+                {
+                    "app": dict(relation.data[relation.app]) if relation.app else {},
+                    "units": {
+                        unit.name: dict(relation.data[unit]) for unit in relation.units
+                    },
+                }
+                for relation in self.model.relations[relation_name]
+            ]
+        return relations_data
+
+    def _get_pod_spec_inputs(self) -> Dict[str, Any]:
+        """
+        Get the inputs the pod spec is built from
+
+        Charms whose pod spec depends on additional state can extend this method
+        instead of disabling fast_reconcile.
+        """
+        return {
+            "config": dict(self.config),
+            "relations": self._get_relations_data(),
+            "image": self._get_image_resource_signature(),
+            "debug": {
+                "enabled": self.debug_mode_enabled,
+                "pubkey": self.debug_pubkey,
+                "hostpaths": getattr(self, "debug_hostpaths", None),
+                "vscode_workspace": self.vscode_workspace,
+            },
+        }
+
+    def _on_upgrade_charm(self, _=None) -> NoReturn:
+        # The new charm code may build a different pod spec from the same inputs,
+        # and a new image resource may have been attached.
+        self.state.pod_spec_inputs = None
+        self.state.image_resource_path = None
+        self.state.validated_configs = {}
+        self.state.sections = {}
+        self.section_cache.clear()
+
+    def _assemble_pod_spec(self) -> NoReturn:
+        """Build the pod spec and apply it, unless its inputs are unchanged."""
+        pod_spec_inputs = None
+        if self.fast_reconcile:
+            with self.timer.span("inputs"):
+                pod_spec_inputs = spec_hash(self._get_pod_spec_inputs())
+            if pod_spec_inputs == self.state.pod_spec_inputs:
+                logger.debug("pod spec inputs unchanged, skipping the assembly")
+                return
+        with self.timer.span("relations"):
+            missing_relations = self.get_missing_relations()
+        if missing_relations:
+            raise RelationsMissing(missing_relations)
+        self.unit.status = MaintenanceStatus("Assembling pod spec")
+        with self.timer.span("image"):
+            image_info = self.image_info
+        with self.timer.span("config"):
+            kwargs = self._get_build_pod_spec_kwargs()
+        with self.timer.span("build"):
+            pod_spec = self.build_pod_spec(image_info, **kwargs)
+        with self.timer.span("debug"):
+            pod_spec = self._debug_if_needed(pod_spec)
+        with self.timer.span("size"):
+            self._check_pod_spec_size(pod_spec)
+        self._set_pod_spec(pod_spec)
+        self.state.pod_spec_inputs = pod_spec_inputs
+
     def configure_pod(self, _=None) -> NoReturn:
-        """Assemble the pod spec and apply it, if possible."""
+        """
+        Assemble the pod spec and apply it, if possible.
+
+        If settle_pod_spec is enabled, the pod spec is only marked as outdated here,
+        and assembled when the framework commits.
+        """
+        if self.settle_pod_spec:
+            self._pod_spec_outdated = True
+        else:
+            self._configure_pod()
+
+    def _on_pre_commit(self, _) -> NoReturn:
+        if self._pod_spec_outdated:
+            self._pod_spec_outdated = False
+            self._configure_pod()
+        if self.timer.spans:
+            self._save_timings()
+
+    def _get_hook_name(self) -> Optional[str]:
+        return os.environ.get("JUJU_DISPATCH_PATH", "").split("/")[-1] or None
+
+    def _save_timings(self) -> NoReturn:
+        """Log the timings of the hook and add them to the history"""
+        timings = json.dumps(self.timer.record(self._get_hook_name()), sort_keys=True)
+        logger.debug(f"timings: {timings}")
+        self.state.timings = [*self.state.timings, timings][-TIMINGS_HISTORY_SIZE:]
+
+    def _on_get_timings_action(self, event) -> NoReturn:
+        event.set_results({"timings": f"[{', '.join(self.state.timings)}]"})
+
+    @property
+    def _profiles_directory(self) -> Path:
+        return Path(self.charm_dir) / PROFILES_DIR
+
+    def _start_profiler(self, profile_option: Optional[str]) -> NoReturn:
+        """Start profiling the hook, if it is enabled"""
+        toggle = os.environ.get(PROFILE_ENV)
+        if not toggle and profile_option:
+            toggle = str(self.config.get(profile_option, ""))
+        profile_modes = parse_profile_modes(toggle)
+        if profile_modes:
+            self.profiler = HookProfiler(self._profiles_directory, profile_modes)
+            self.profiler.start()
+
+    def _on_commit(self, _) -> NoReturn:
+        if self.profiler:
+            profiles = self.profiler.stop(self._get_hook_name())
+            self.profiler = None
+            logger.debug(f"profiles written: {', '.join(map(str, profiles))}")
+
+    def _on_get_profiles_action(self, event) -> NoReturn:
+        profiles = HookProfiler(self._profiles_directory, set()).profiles()
+        allocations = [p for p in profiles if p.name.endswith(ALLOCATIONS_SUFFIX)]
+        event.set_results(
+            {
+                "directory": str(self._profiles_directory),
+                "files": "\n".join(profile.name for profile in profiles),
+                "allocations": allocations[-1].read_text() if allocations else "",
+            }
+        )
+
+    def _configure_pod(self) -> NoReturn:
         try:
             if self.unit.is_leader():
-                self.unit.status = MaintenanceStatus("Assembling pod spec")
-                image_info = self.image.fetch()
-                kwargs = self._get_build_pod_spec_kwargs()
-                pod_spec = self.build_pod_spec(image_info, **kwargs)
-                self._debug_if_needed(pod_spec)
-                self._set_pod_spec(pod_spec)
+                self._assemble_pod_spec()
 
             self.unit.status = ActiveStatus("ready")
         except OCIImageResourceError:
@@ -265,9 +783,39 @@ class CharmedOsmBase(CharmBase):
             logger.debug(traceback.format_exc())
             self.unit.status = BlockedStatus(error_message)
 
+    def _is_applied_legacy_pod_spec(self, pod_spec: Dict[str, Any]) -> bool:
+        """Check if the pod spec was applied by a version storing hash_from_dict hashes"""
+        return (
+            self.state.pod_spec is not None
+            and not self.state.pod_spec.startswith(SPEC_HASH_PREFIX)
+            and self.state.pod_spec == hash_from_dict(pod_spec)
+        )
+
     def _set_pod_spec(self, pod_spec: Dict[str, Any]) -> NoReturn:
-        pod_spec_hash = hash_from_dict(pod_spec)
+        with self.timer.span("hash"):
+            pod_spec_hash = spec_hash(pod_spec)
         if self.state.pod_spec != pod_spec_hash:
-            self.model.pod.set_spec(pod_spec)
+            applied_paths = self.state.pod_spec_paths or {}
+            if not self.state.pod_spec_paths_key:
+                # Random salt of the digests of the values, which may be passwords.
+                # Paths stored without it cannot be compared.
+                self.state.pod_spec_paths_key = os.urandom(32).hex()
+                applied_paths = {}
+            with self.timer.span("diff"):
+                pod_spec_paths = flatten_pod_spec(
+                    pod_spec, bytes.fromhex(self.state.pod_spec_paths_key)
+                )
+            if not self._is_applied_legacy_pod_spec(pod_spec):
+                with self.timer.span("diff"):
+                    self.pod_spec_diff = diff_pod_specs(applied_paths, pod_spec_paths)
+                with self.timer.span("set_spec"):
+                    self.model.pod.set_spec(thaw(pod_spec))
+                restart = (
+                    " (forces restart)" if self.pod_spec_diff.forces_restart else ""
+                )
+                logger.debug(
+                    f"applying pod spec with hash {pod_spec_hash}{restart}: "
+                    f"{self.pod_spec_diff.summary()}"
+                )
             self.state.pod_spec = pod_spec_hash
-            logger.debug(f"applying pod spec with hash {pod_spec_hash}")
+            self.state.pod_spec_paths = pod_spec_paths
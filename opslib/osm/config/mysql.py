@@ -1,50 +1,41 @@
 # pylint: disable=E0213
-import re
 from typing import Optional
 
 
+from .uri import MYSQL_URI_PARSER, ParsedUri
 from ..validator import ModelValidator, validator
 
 
 class MysqlModel(ModelValidator):
     mysql_uri: Optional[str]
-    _compiled_regex = re.compile(
-        r"^mysql\:\/\/{}@{}\/{}?$".format(
-            r"(?P<username>[_\w]+):(?P<password>[\w\W]+)",
-            r"(?P<host>[\.\w]+):(?P<port>\d+)",
-            r"(?P<database>[_\w]+)",
-        )
-    )
-
-    @classmethod
-    def _extract_data_from_uri(cls, v):
-        match = cls._compiled_regex.search(v)
-        if match:
-            return match.groupdict()
-        else:
-            raise ValueError("mysql_uri is not properly formed")
 
     @validator("mysql_uri")
     def validate_mysql_uri(cls, v):
-        cls.mysql_data = MysqlModel._extract_data_from_uri(v) if v else {}
+        if v:
+            MYSQL_URI_PARSER.parse(v)
         return v
 
     @property
-    def host(cls):
-        return cls.mysql_data.get("host")
+    def mysql(self) -> Optional[ParsedUri]:
+        """Parsed mysql_uri. URIs are parsed once per process."""
+        return MYSQL_URI_PARSER.parse(self.mysql_uri) if self.mysql_uri else None
 
     @property
-    def port(cls):
-        return int(cls.mysql_data.get("port")) if cls.mysql_data else None
+    def host(self):
+        return self.mysql.host if self.mysql else None
 
     @property
-    def username(cls):
-        return cls.mysql_data.get("username")
+    def port(self):
+        return self.mysql.port if self.mysql else None
 
     @property
-    def password(cls):
-        return cls.mysql_data.get("password")
+    def username(self):
+        return self.mysql.username if self.mysql else None
 
     @property
-    def database(cls):
-        return cls.mysql_data.get("database")
+    def password(self):
+        return self.mysql.password if self.mysql else None
+
+    @property
+    def database(self):
+        return self.mysql.path if self.mysql else None
@@ -0,0 +1,98 @@
+__all__ = ["ParsedUri", "UriParser", "URI_PARSER", "MYSQL_URI_PARSER"]
+
+from functools import lru_cache
+import re
+from typing import NamedTuple, Optional, Tuple
+from urllib.parse import parse_qsl
+
+# Number of parsed URIs cached by every parser
+URI_CACHE_SIZE = 128
+
+
+_HOST_REGEX = re.compile(r"^(?P<host>\[[^\]]+\]|[^:\[\]]+)(?::(?P<port>\d+))?$")
+
+
+class ParsedUri(NamedTuple):
+    scheme: Optional[str]
+    username: Optional[str]
+    password: Optional[str]
+    # First host of the URI, and its port
+    host: Optional[str]
+    port: Optional[int]
+    # Part after the first slash following the hosts, e.g. the database name
+    path: Optional[str]
+    # Every (host, port) of the URI, for URIs listing several hosts
+    hosts: Tuple[Tuple[Optional[str], Optional[int]], ...] = ()
+    # Every (name, value) of the query string, e.g. (("authSource", "admin"),)
+    options: Tuple[Tuple[str, str], ...] = ()
+
+
+class UriParser:
+    """
+    Parser of URIs with a regular expression
+
+    The expression may define the groups scheme, username, password, host, port,
+    path and query; the missing ones are None in the parsed URI. Instead of host
+    and port, it may define a hosts group with a comma separated list of
+    host[:port]. The query string is parsed into the options of the URI.
+    URIs are parsed once per process, as the parsed URIs are kept in an LRU cache.
+    """
+
+    def __init__(self, name: str, pattern: str, cache_size: int = URI_CACHE_SIZE):
+        """
+        :param: name: Name of the URIs, used in the error messages (e.g. mysql_uri)
+        :param: pattern: Regular expression matching the whole URI
+        :param: cache_size: Number of parsed URIs cached
+        """
+        self.name = name
+        self._regex = re.compile(pattern)
+        self.parse = lru_cache(maxsize=cache_size)(self._parse)
+
+    def _parse(self, uri: str) -> ParsedUri:
+        match = self._regex.search(uri)
+        if not match:
+            raise ValueError(f"{self.name} is not properly formed")
+        groups = match.groupdict()
+        if groups.get("hosts") is not None:
+            hosts = tuple(self._parse_host(host) for host in groups["hosts"].split(","))
+        else:
+            port = groups.get("port")
+            hosts = ((groups.get("host"), int(port) if port else None),)
+        return ParsedUri(
+            scheme=groups.get("scheme"),
+            username=groups.get("username"),
+            password=groups.get("password"),
+            host=hosts[0][0],
+            port=hosts[0][1],
+            path=groups.get("path") or None,
+            hosts=hosts,
+            options=tuple(parse_qsl(groups.get("query") or "", keep_blank_values=True)),
+        )
+
+    def _parse_host(self, host: str) -> Tuple[str, Optional[int]]:
+        match = _HOST_REGEX.match(host)
+        if not match:
+            raise ValueError(f"{self.name} is not properly formed")
+        port = match.group("port")
+        return match.group("host"), int(port) if port else None
+
+
+# [scheme://][username[:password]@]host[:port][,host[:port]...][/path][?query],
+# e.g. mongodb://mongo-0:27017,mongo-1:27017/osm?replicaSet=rs0 or kafka:9092
+URI_PARSER = UriParser(
+    "uri",
+    r"^(?:(?P<scheme>[a-z][\w+.-]*)://)?"
+    r"(?:(?P<username>[^:@/]+)(?::(?P<password>[^@/]*))?@)?"
+    r"(?P<hosts>[^@/?]+)"
+    r"(?:/(?P<path>[^?]*))?"
+    r"(?:\?(?P<query>.*))?$",
+)
+
+MYSQL_URI_PARSER = UriParser(
+    "mysql_uri",
+    r"^(?P<scheme>mysql)\:\/\/{}@{}\/{}?$".format(
+        r"(?P<username>[_\w]+):(?P<password>[\w\W]+)",
+        r"(?P<host>[\.\w]+):(?P<port>\d+)",
+        r"(?P<path>[_\w]+)",
+    ),
+)
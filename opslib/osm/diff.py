@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# Copyright 2021 Canonical Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# For those usages not covered by the Apache License, Version 2.0 please
+# contact: legal@canonical.com
+#
+# To get in touch with the maintainers, please contact:
+# osm-charmers@lists.launchpad.net
+##
+
+__all__ = [
+    "flatten_pod_spec",
+    "diff_pod_specs",
+    "PodSpecDiff",
+    "OPAQUE_LIST_PATHS",
+    "RESTART_PATHS",
+]
+
+
+import hashlib
+import json
+import re
+from typing import Any, Dict, List, Mapping, NamedTuple
+
+
+# Changes under these paths modify the pod template, so Kubernetes rolls out new pods.
+# Changes anywhere else (ingress resources, secrets, ...) are applied in place.
+RESTART_PATHS = ("containers", "initContainers", "kubernetesResources.pod")
+
+# Keys used to identify the items of a list in the paths, instead of their index
+LIST_ITEM_KEYS = ("name", "path")
+
+# Lists whose items get a single digest, so no value in them has a digest of its own
+OPAQUE_LIST_PATHS = ("kubernetesResources.secrets",)
+
+_PLAIN_KEY = re.compile(r"^[A-Za-z_][\w-]*$")
+
+
+def _leaf_digest(value: Any, key: bytes) -> str:
+    content = json.dumps(value, sort_keys=True).encode()
+    return hashlib.blake2b(content, digest_size=8, key=key).hexdigest()
+
+
+def _key_path(path: str, key: Any) -> str:
+    if isinstance(key, str) and _PLAIN_KEY.match(key):
+        return f"{path}.{key}" if path else key
+    return f"{path}[{json.dumps(key)}]"
+
+
+def _item_paths(path: str, items: List[Any]) -> List[str]:
+    item_paths = []
+    seen = set()
+    for index, item in enumerate(items):
+        item_path = f"{path}[{index}]"
+        if isinstance(item, Mapping):
+            for item_key in LIST_ITEM_KEYS:
+                if item_key in item:
+                    candidate = f"{path}[{item_key}={json.dumps(item[item_key])}]"
+                    if candidate not in seen:
+                        item_path = candidate
+                        break
+        seen.add(item_path)
+        item_paths.append(item_path)
+    return item_paths
+
+
+def _flatten(value: Any, path: str, flat: Dict[str, str], key: bytes):
+    if isinstance(value, Mapping) and value:
+        for child_key, child in value.items():
+            _flatten(child, _key_path(path, child_key), flat, key)
+    elif isinstance(value, (list, tuple)) and value:
+        opaque = path in OPAQUE_LIST_PATHS
+        for item_path, item in zip(_item_paths(path, value), value):
+            if opaque:
+                flat[item_path] = _leaf_digest(item, key)
+            else:
+                _flatten(item, item_path, flat, key)
+    else:
+        flat[path] = _leaf_digest(value, key)
+
+
+def flatten_pod_spec(pod_spec: Mapping[str, Any], key: bytes = b"") -> Dict[str, str]:
+    """
+    Get the compact canonical form of a pod spec
+
+    The digests are short, so they must be keyed when the values hold passwords:
+    otherwise, low entropy values could be found by brute force.
+
+    :param: pod_spec: Pod spec
+    :param: key: Key of the digests, up to 64 bytes. Only forms flattened with the
+                 same key can be compared.
+
+    :return: A dictionary with the path of every leaf of the pod spec, and a short
+             digest of its value. List items are identified by their name or path
+             key, if they have one, so reordering them is not seen as a change.
+             The secrets get a single digest each (see OPAQUE_LIST_PATHS).
+    """
+    flat = {}
+    _flatten(pod_spec, "", flat, key)
+    return flat
+
+
+class PodSpecDiff(NamedTuple):
+    added: List[str]
+    removed: List[str]
+    changed: List[str]
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+    @property
+    def paths(self) -> List[str]:
+        """All the paths that differ"""
+        return sorted(self.added + self.removed + self.changed)
+
+    @property
+    def restart_paths(self) -> List[str]:
+        """Paths that differ and force a restart of the pod"""
+        return [
+            path
+            for path in self.paths
+            if any(
+                path == prefix or path.startswith((f"{prefix}.", f"{prefix}["))
+                for prefix in RESTART_PATHS
+            )
+        ]
+
+    @property
+    def forces_restart(self) -> bool:
+        return bool(self.restart_paths)
+
+    def summary(self, max_paths: int = 10) -> str:
+        """Concise, human readable description of the differences"""
+        parts = []
+        for name, paths in (
+            ("added", self.added),
+            ("removed", self.removed),
+            ("changed", self.changed),
+        ):
+            if paths:
+                shown = ", ".join(paths[:max_paths])
+                if len(paths) > max_paths:
+                    shown += f" and {len(paths) - max_paths} more"
+                parts.append(f"{name}: {shown}")
+        return "; ".join(parts) if parts else "no changes"
+
+
+def diff_pod_specs(
+    old_flat: Mapping[str, str], new_flat: Mapping[str, str]
+) -> PodSpecDiff:
+    """
+    Get the differences between two pod specs in their compact canonical form
+
+    :param: old_flat: Flattened pod spec (see flatten_pod_spec)
+    :param: new_flat: Flattened pod spec (see flatten_pod_spec)
+    """
+    return PodSpecDiff(
+        added=sorted(path for path in new_flat if path not in old_flat),
+        removed=sorted(path for path in old_flat if path not in new_flat),
+        changed=sorted(
+            path
+            for path in new_flat
+            if path in old_flat and old_flat[path] != new_flat[path]
+        ),
+    )
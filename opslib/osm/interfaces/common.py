@@ -1,9 +1,287 @@
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
 import ops.charm
 import ops.framework
+import ops.model
+
+from ..utils import content_digest
+
+
+class RelationDataSnapshot:
+    """Immutable copy of the remote application and units data of a relation"""
+
+    def __init__(
+        self,
+        app_data: Optional[Mapping[str, str]] = None,
+        units_data: Optional[Mapping[str, Mapping[str, str]]] = None,
+    ):
+        self.app_data = MappingProxyType(dict(app_data or {}))
+        self.units_data = MappingProxyType(
+            {
+                unit_name: MappingProxyType(dict(unit_data))
+                for unit_name, unit_data in (units_data or {}).items()
+            }
+        )
+
+    def get_data_from_unit(self, key: str):
+        for unit_data in self.units_data.values():
+            data = unit_data.get(key)
+            if data:
+                return data
+
+    def get_data_from_app(self, key: str):
+        data = self.app_data.get(key)
+        if data:
+            return data
+
+
+class RelationPrefetcher(ops.framework.Object):
+    """
+    Reads the data bags of several relations concurrently
+
+    Every relation-get is a hook tool call, so reading the bags of the relations of
+    a charm one after another adds up. The prefetcher reads all the application and
+    unit bags of the registered relations at once, on a bounded thread pool, the
+    first time any of them is needed. The relation clients are served from the
+    result, and the ops model caches are warmed as well.
+
+    To use it, set the relation_prefetcher attribute of the charm before creating
+    the relation clients; they register their relations in it. CharmedOsmBase does
+    it when initialized with prefetch_relations=True.
+    """
+
+    def __init__(self, charm: ops.charm.CharmBase, max_workers: int = 8):
+        """
+        :param: charm: Charm
+        :param: max_workers: Maximum number of concurrent relation-get calls
+        """
+        super().__init__(charm, "relation-prefetcher")
+        self.charm = charm
+        self.max_workers = max_workers
+        # Number of relation data bags read
+        self.relation_data_reads = 0
+        self._relation_names = []
+        self._snapshots = {}
+
+    def register(self, relation_name: str):
+        """Register a relation to be prefetched"""
+        if relation_name in self._relation_names:
+            return
+        self._relation_names.append(relation_name)
+        relation_events = self.charm.on[relation_name]
+        for event in (
+            relation_events.relation_joined,
+            relation_events.relation_changed,
+            relation_events.relation_departed,
+            relation_events.relation_broken,
+        ):
+            self.framework.observe(event, self._on_relation_event)
+
+    def _on_relation_event(self, event):
+        self.invalidate(event.relation.name)
+
+    def invalidate(self, relation_name: str):
+        """Forget the data of a relation, so it is read again on the next access"""
+        self._snapshots.pop(relation_name, None)
+
+    def prefetch(self, relation_names: Iterable[str] = ()):
+        """
+        Read the data of the registered relations not read yet
+
+        :param: relation_names: Additional relations to read
+        """
+        for relation_name in relation_names:
+            self.register(relation_name)
+        pending = [
+            relation_name
+            for relation_name in self._relation_names
+            if relation_name not in self._snapshots
+        ]
+        if not pending:
+            return
+        # relation-ids and relation-list are issued by the ops model, which is not
+        # thread safe; the relation objects are usually cached by the clients already.
+        relations = {
+            relation_name: list(self.charm.model.relations[relation_name])
+            for relation_name in pending
+        }
+        bags = [
+            (relation, entity)
+            for relation_list in relations.values()
+            for relation in relation_list
+            for entity in self._remote_entities(relation)
+        ]
+        data = {}
+        if bags:
+            with ThreadPoolExecutor(min(self.max_workers, len(bags))) as executor:
+                for bag, bag_data in zip(bags, executor.map(self._read_bag, bags)):
+                    data[bag] = bag_data
+            self.relation_data_reads += len(bags)
+        for relation_name, relation_list in relations.items():
+            self._snapshots[relation_name] = [
+                (relation, self._snapshot(relation, data)) for relation in relation_list
+            ]
+
+    @staticmethod
+    def _remote_entities(relation: ops.model.Relation) -> List:
+        entities = list(relation.units)
+        if relation.app is not None and relation.app in relation.data:
+            entities.append(relation.app)
+        return entities
+
+    @staticmethod
+    def _read_bag(bag: Tuple[ops.model.Relation, object]) -> Dict[str, str]:
+        relation, entity = bag
+        return dict(relation.data[entity])
+
+    @staticmethod
+    def _snapshot(relation: ops.model.Relation, data: Dict) -> "RelationDataSnapshot":
+        app_bag = (relation, relation.app)
+        return RelationDataSnapshot(
+            data.get(app_bag),
+            {unit.name: data[(relation, unit)] for unit in relation.units},
+        )
+
+    def get_snapshots(
+        self, relation_name: str
+    ) -> List[Tuple[ops.model.Relation, "RelationDataSnapshot"]]:
+        """
+        Get the relations with a name, and a snapshot of the data of each one
+
+        The registered relations are prefetched if needed.
+        """
+        self.prefetch([relation_name])
+        return self._snapshots[relation_name]
+
+    def get_snapshot(self, relation_name: str) -> Optional["RelationDataSnapshot"]:
+        """
+        Get a snapshot of the data of a relation
+
+        :return: The snapshot, or None if there is not exactly one relation with the
+                 name, or its remote application is not known yet.
+        """
+        snapshots = self.get_snapshots(relation_name)
+        if len(snapshots) != 1:
+            return None
+        relation, snapshot = snapshots[0]
+        if relation.app is None or relation.app not in relation.data:
+            return None
+        return snapshot
+
+
+class BaseRelationProvider(ops.framework.Object):
+    """Provides side of an Endpoint"""
+
+    relation_name: str = None
+
+    def __init__(self, charm: ops.charm.CharmBase, relation_name: str):
+        super().__init__(charm, relation_name)
+        self.relation_name = relation_name
+
+    def publish_data(self, data: Dict[str, str], include_unit: bool = False) -> int:
+        """
+        Publish data in every relation, if the unit is the leader
+
+        Only the keys whose value differs from the current content of the relation
+        data are written. The writes are not batched: ops 1.1 has no bulk update,
+        so every changed key is still one relation-set call. Unchanged keys cost
+        no call.
+
+        :param: data: Data to publish in the application relation data
+        :param: include_unit: Publish the data in the unit relation data as well
+
+        :return: Number of keys written
+        """
+        if not self.framework.model.unit.is_leader():
+            return 0
+        relation_data_targets = [self.framework.model.app]
+        if include_unit:
+            relation_data_targets.append(self.framework.model.unit)
+        writes = 0
+        for relation in self.framework.model.relations[self.relation_name]:
+            for relation_data_target in relation_data_targets:
+                relation_data = relation.data[relation_data_target]
+                changes = {
+                    key: value
+                    for key, value in data.items()
+                    if relation_data.get(key) != value
+                }
+                relation_data.update(changes)
+                writes += len(changes)
+        return writes
+
+
+class RelationClientEvent(ops.framework.EventBase):
+    """Base class of the events emitted by the relation clients"""
+
+    def __init__(self, handle, relation: ops.model.Relation):
+        super().__init__(handle)
+        self.relation = relation
+
+    def snapshot(self) -> dict:
+        return {
+            "relation_name": self.relation.name,
+            "relation_id": self.relation.id,
+        }
+
+    def restore(self, snapshot: dict):
+        self.relation = self.framework.model.get_relation(
+            snapshot["relation_name"], snapshot["relation_id"]
+        )
+
+
+class RelationClientReadyEvent(RelationClientEvent):
+    """The mandatory data of the relation is available"""
+
+
+class RelationClientChangedEvent(RelationClientEvent):
+    """Some of the fields of a ready relation changed"""
+
+    def __init__(self, handle, relation: ops.model.Relation, fields: List[str] = ()):
+        super().__init__(handle, relation)
+        self.fields = list(fields)
+
+    def snapshot(self) -> dict:
+        snapshot = super().snapshot()
+        snapshot["fields"] = self.fields
+        return snapshot
+
+    def restore(self, snapshot: dict):
+        super().restore(snapshot)
+        self.fields = snapshot["fields"]
+
+
+class RelationClientBrokenEvent(RelationClientEvent):
+    """A ready relation is gone, or its mandatory data is not available anymore"""
+
+
+class RelationClientEvents(ops.framework.ObjectEvents):
+    ready = ops.framework.EventSource(RelationClientReadyEvent)
+    changed = ops.framework.EventSource(RelationClientChangedEvent)
+    broken = ops.framework.EventSource(RelationClientBrokenEvent)
 
 
 class BaseRelationClient(ops.framework.Object):
-    """Requires side of a Kafka Endpoint"""
+    """
+    Requires side of a Kafka Endpoint
+
+    Besides the raw relation events, the client emits ready, changed and broken
+    events (see client_events), only when the mandatory or optional fields of the
+    relation actually change. The digest of every field is kept in the stored state
+    of the client, per relation, so identical rewrites of the data, or changes in
+    keys the client does not declare, do not trigger a reconcile of the charm.
+
+    The events are not in the on attribute, so subclasses can define their own.
+    """
+
+    client_events = RelationClientEvents()
+    _client_state = ops.framework.StoredState()
+
+    # Fields that are not needed for the relation to be ready, but are used by the
+    # charm if available, so changes in them are notified as well.
+    optional_fields: List[str] = []
 
     def __init__(
         self,
@@ -14,41 +292,144 @@ class BaseRelationClient(ops.framework.Object):
         super().__init__(charm, relation_name)
         self.relation_name = relation_name
         self.mandatory_fields = mandatory_fields
+        # Number of relation data bags looked up in the ops model. The model loads
+        # every bag lazily, with one relation-get call, whether or not a snapshot
+        # is used: the snapshot only saves the lookups of a multi-field read.
+        self.relation_data_reads = 0
+        self._prefetcher = getattr(charm, "relation_prefetcher", None)
+        if self._prefetcher:
+            self._prefetcher.register(relation_name)
         self._update_relation()
+        self._client_state.set_default(relations={})
 
-    def get_data_from_unit(self, key: str):
+        relation_events = charm.on[relation_name]
+        for event in (
+            relation_events.relation_joined,
+            relation_events.relation_changed,
+            relation_events.relation_departed,
+            relation_events.relation_broken,
+        ):
+            self.framework.observe(event, self._on_relation_event)
+
+    def _on_relation_event(self, event):
+        self.invalidate_snapshot()
+        if isinstance(event, ops.charm.RelationBrokenEvent):
+            self._forget_relation(event.relation)
+        else:
+            self._check_fields(event.relation)
+
+    @property
+    def tracked_fields(self) -> List[str]:
+        """Fields whose changes are notified: mandatory fields, then optional ones"""
+        return list(dict.fromkeys([*self.mandatory_fields, *self.optional_fields]))
+
+    def is_ready(self) -> bool:
+        """Whether the mandatory data is available, in the application or the units"""
         if not self.relation:
-            # This update relation doesn't seem to be needed, but I added it because apparently
-            # the data is empty in the unit tests.
-            # In reality, the constructor is called in every hook.
-            # In the unit tests when doing an update_relation_data, apparently it is not called.
-            self._update_relation()
+            return False
+        return not self.is_missing_data_in_app() or not self.is_missing_data_in_unit()
+
+    def get_field_digests(self) -> Dict[str, Optional[str]]:
+        """Get the digest of the value of every tracked field"""
+        snapshot = self.get_snapshot()
+        digests = {}
+        for field in self.tracked_fields:
+            value = snapshot.get_data_from_app(field) or snapshot.get_data_from_unit(
+                field
+            )
+            digests[field] = content_digest(value) if value else None
+        return digests
+
+    def _check_fields(self, relation: ops.model.Relation):
+        key = str(relation.id)
+        previous = self._client_state.relations.get(key)
+        was_ready = bool(previous and previous["ready"])
+        # Both read the ops model, which always has the data of the current event
+        ready = self.is_ready()
+        digests = self.get_field_digests()
+        self._client_state.relations[key] = {"ready": ready, "fields": digests}
+        if not ready:
+            if was_ready:
+                self.client_events.broken.emit(relation)
+        elif not was_ready:
+            self.client_events.ready.emit(relation)
+        else:
+            fields = [
+                field
+                for field, digest in digests.items()
+                if previous["fields"].get(field) != digest
+            ]
+            if fields:
+                self.client_events.changed.emit(relation, fields)
+
+    def _forget_relation(self, relation: ops.model.Relation):
+        previous = self._client_state.relations.pop(str(relation.id), None)
+        if previous and previous["ready"]:
+            self.client_events.broken.emit(relation)
+
+    def invalidate_snapshot(self):
+        """Forget the prefetched relation data, so it is read again on the next access"""
+        if self._prefetcher:
+            self._prefetcher.invalidate(self.relation_name)
+
+    def get_snapshot(self) -> RelationDataSnapshot:
+        """
+        Get a snapshot of the remote application and units data
+
+        The snapshot is read from the ops model on every call, and is meant to be
+        used for a single multi-field read, like is_missing_data_in_app does. It is
+        not kept: the ops model already loads every bag once, and drops it when the
+        relation data changes, so a new snapshot is never stale, whatever the order
+        in which the relation events are observed.
+        """
+        self._load_relation()
+        if not self.relation:
+            return RelationDataSnapshot()
+        units_data = {}
+        for unit in self.relation.units:
+            units_data[unit.name] = self.relation.data[unit]
+            self.relation_data_reads += 1
+        app_data = None
+        if self.relation.app in self.relation.data:
+            app_data = self.relation.data[self.relation.app]
+            self.relation_data_reads += 1
+        return RelationDataSnapshot(app_data, units_data)
+
+    def _load_relation(self):
+        if self._prefetcher:
+            # Read the bags of the registered relations concurrently, once
+            self._prefetcher.prefetch([self.relation_name])
+        # The relations are cached by the ops model until they change, so this only
+        # replaces a relation object whose units are outdated
+        self._update_relation()
+
+    def get_data_from_unit(self, key: str):
+        self._load_relation()
         if self.relation:
             for unit in self.relation.units:
+                self.relation_data_reads += 1
                 data = self.relation.data[unit].get(key)
                 if data:
                     return data
 
     def get_data_from_app(self, key: str):
-        if not self.relation or self.relation.app not in self.relation.data:
-            # This update relation doesn't seem to be needed, but I added it because apparently
-            # the data is empty in the unit tests.
-            # In reality, the constructor is called in every hook.
-            # In the unit tests when doing an update_relation_data, apparently it is not called.
-            self._update_relation()
+        self._load_relation()
         if self.relation and self.relation.app in self.relation.data:
+            self.relation_data_reads += 1
             data = self.relation.data[self.relation.app].get(key)
             if data:
                 return data
 
     def is_missing_data_in_unit(self):
+        snapshot = self.get_snapshot()
         return not all(
-            [self.get_data_from_unit(field) for field in self.mandatory_fields]
+            [snapshot.get_data_from_unit(field) for field in self.mandatory_fields]
         )
 
     def is_missing_data_in_app(self):
+        snapshot = self.get_snapshot()
         return not all(
-            [self.get_data_from_app(field) for field in self.mandatory_fields]
+            [snapshot.get_data_from_app(field) for field in self.mandatory_fields]
         )
 
     def _update_relation(self):
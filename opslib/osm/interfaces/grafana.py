@@ -21,33 +21,22 @@ Ported to the Operator Framework from the canonical-osm Reactive
 charms at https://git.launchpad.net/canonical-osm
 """
 
-from typing import NoReturn
-
 import ops.charm
 import ops.framework
 import ops.model
 
-from .common import BaseRelationClient
+from .common import BaseRelationClient, BaseRelationProvider
 
 
-class GrafanaDashboardTarget(ops.framework.Object):
+class GrafanaDashboardTarget(BaseRelationProvider):
     """Provides side of a Grafana Dashboards endpoint"""
 
-    relation_name: str = None
-
-    def __init__(self, charm: ops.charm.CharmBase, relation_name: str):
-        super().__init__(charm, relation_name)
-        self.relation_name = relation_name
-
     def publish_info(
         self,
         name: str,
         dashboard: str,
-    ) -> NoReturn:
-        if self.framework.model.unit.is_leader():
-            for relation in self.framework.model.relations[self.relation_name]:
-                relation.data[self.framework.model.app]["name"] = name
-                relation.data[self.framework.model.app]["dashboard"] = dashboard
+    ) -> int:
+        return self.publish_data({"name": name, "dashboard": dashboard})
 
 
 class GrafanaDashboardServer(BaseRelationClient):
@@ -78,6 +67,7 @@ class GrafanaCluster(BaseRelationClient):
             self.relation.data[self.framework.model.app][
                 "admin_initial_password"
             ] = str(password)
+            self.invalidate_snapshot()
 
     @property
     def admin_initial_password(self) -> int:
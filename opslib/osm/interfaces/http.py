@@ -20,18 +20,12 @@ import ops.charm
 import ops.framework
 import ops.model
 
-from .common import BaseRelationClient
+from .common import BaseRelationClient, BaseRelationProvider
 
 
-class HttpServer(ops.framework.Object):
+class HttpServer(BaseRelationProvider):
     """Provides side of a Http Endpoint"""
 
-    relation_name: str = None
-
-    def __init__(self, charm: ops.charm.CharmBase, relation_name: str):
-        super().__init__(charm, relation_name)
-        self.relation_name = relation_name
-
     def publish_info(
         self,
         host: str,
@@ -39,15 +33,16 @@ class HttpServer(ops.framework.Object):
         path: str = None,
         basic_auth_username: str = None,
         basic_auth_password: str = None,
-    ):
-        if self.framework.model.unit.is_leader():
-            for relation in self.framework.model.relations[self.relation_name]:
-                relation_data = relation.data[self.framework.model.app]
-                relation_data["host"] = str(host)
-                relation_data["port"] = str(port)
-                relation_data["path"] = str(path)
-                relation_data["basic_auth_username"] = str(basic_auth_username)
-                relation_data["basic_auth_password"] = str(basic_auth_password)
+    ) -> int:
+        return self.publish_data(
+            {
+                "host": str(host),
+                "port": str(port),
+                "path": str(path),
+                "basic_auth_username": str(basic_auth_username),
+                "basic_auth_password": str(basic_auth_password),
+            }
+        )
 
 
 class HttpClient(BaseRelationClient):
@@ -1,23 +1,13 @@
 import ops.charm
 
-from .common import BaseRelationClient
+from .common import BaseRelationClient, BaseRelationProvider
 
 
-class KafkaServer(ops.framework.Object):
+class KafkaServer(BaseRelationProvider):
     """Provides side of a Kafka Endpoint"""
 
-    relation_name: str = None
-
-    def __init__(self, charm: ops.charm.CharmBase, relation_name: str):
-        super().__init__(charm, relation_name)
-        self.relation_name = relation_name
-
-    def publish_info(self, host: str, port: int):
-        if self.framework.model.unit.is_leader():
-            for relation in self.framework.model.relations[self.relation_name]:
-                relation_data = relation.data[self.framework.model.app]
-                relation_data["host"] = str(host)
-                relation_data["port"] = str(port)
+    def publish_info(self, host: str, port: int) -> int:
+        return self.publish_data({"host": str(host), "port": str(port)})
 
 
 class KafkaClient(BaseRelationClient):
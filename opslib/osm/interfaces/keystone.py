@@ -25,18 +25,12 @@ import ops.charm
 import ops.framework
 import ops.model
 
-from .common import BaseRelationClient
+from .common import BaseRelationClient, BaseRelationProvider
 
 
-class KeystoneServer(ops.framework.Object):
+class KeystoneServer(BaseRelationProvider):
     """Provides side of a Keystone Endpoint"""
 
-    relation_name: str = None
-
-    def __init__(self, charm: ops.charm.CharmBase, relation_name: str):
-        super().__init__(charm, relation_name)
-        self.relation_name = relation_name
-
     def publish_info(
         self,
         host: str,
@@ -51,22 +45,23 @@ class KeystoneServer(ops.framework.Object):
         admin_username: str,
         admin_password: str,
         admin_project_name: str,
-    ):
-        if self.framework.model.unit.is_leader():
-            for relation in self.framework.model.relations[self.relation_name]:
-                relation_data = relation.data[self.framework.model.app]
-                relation_data["host"] = str(host)
-                relation_data["port"] = str(port)
-                relation_data["user_domain_name"] = str(user_domain_name)
-                relation_data["project_domain_name"] = str(project_domain_name)
-                relation_data["username"] = str(username)
-                relation_data["password"] = str(password)
-                relation_data["service"] = str(service)
-                relation_data["keystone_db_password"] = str(keystone_db_password)
-                relation_data["region_id"] = str(region_id)
-                relation_data["admin_username"] = str(admin_username)
-                relation_data["admin_password"] = str(admin_password)
-                relation_data["admin_project_name"] = str(admin_project_name)
+    ) -> int:
+        return self.publish_data(
+            {
+                "host": str(host),
+                "port": str(port),
+                "user_domain_name": str(user_domain_name),
+                "project_domain_name": str(project_domain_name),
+                "username": str(username),
+                "password": str(password),
+                "service": str(service),
+                "keystone_db_password": str(keystone_db_password),
+                "region_id": str(region_id),
+                "admin_username": str(admin_username),
+                "admin_password": str(admin_password),
+                "admin_project_name": str(admin_project_name),
+            }
+        )
 
 
 class KeystoneClient(BaseRelationClient):
@@ -10,6 +10,10 @@ class MongoClient(BaseRelationClient):
         "reactive": ["connection_string"],
         "ops": ["replica_set_uri", "replica_set_name"],
     }
+    optional_fields = [
+        *mandatory_fields_mapping["reactive"],
+        *mandatory_fields_mapping["ops"],
+    ]
 
     def __init__(self, charm: ops.charm.CharmBase, relation_name: str):
         super().__init__(charm, relation_name, mandatory_fields=[])
@@ -26,6 +30,9 @@ class MongoClient(BaseRelationClient):
     def is_opts(self):
         return not self.is_missing_data_in_unit_ops()
 
+    def is_ready(self):
+        return bool(self.relation) and not self.is_missing_data_in_unit()
+
     def is_missing_data_in_unit(self):
         return (
             self.is_missing_data_in_unit_ops()
@@ -21,39 +21,29 @@ Ported to the Operator Framework from the canonical-osm Reactive
 charms at https://git.launchpad.net/canonical-osm
 """
 
-from typing import NoReturn
-
 import ops.charm
 import ops.framework
 import ops.model
 
-from .common import BaseRelationClient
+from .common import BaseRelationClient, BaseRelationProvider
 
 
-class PrometheusServer(ops.framework.Object):
+class PrometheusServer(BaseRelationProvider):
     """Provides side of a Prometheus Endpoint"""
 
-    relation_name: str = None
-
-    def __init__(self, charm: ops.charm.CharmBase, relation_name: str):
-        super().__init__(charm, relation_name)
-        self.relation_name = relation_name
-
     def publish_info(
         self,
         hostname: str,
         port: int = 9091,
         user: str = None,
         password: str = None,
-    ):
-        if self.framework.model.unit.is_leader():
-            for relation in self.framework.model.relations[self.relation_name]:
-                relation.data[self.framework.model.app]["hostname"] = hostname
-                relation.data[self.framework.model.app]["port"] = str(port)
-                if user:
-                    relation.data[self.framework.model.app]["user"] = user
-                if password:
-                    relation.data[self.framework.model.app]["password"] = password
+    ) -> int:
+        data = {"hostname": hostname, "port": str(port)}
+        if user:
+            data["user"] = user
+        if password:
+            data["password"] = password
+        return self.publish_data(data)
 
 
 class PrometheusClient(BaseRelationClient):
@@ -81,15 +71,9 @@ class PrometheusClient(BaseRelationClient):
         return self.get_data_from_app("password")
 
 
-class PrometheusScrapeTarget(ops.framework.Object):
+class PrometheusScrapeTarget(BaseRelationProvider):
     """Provides side of a Prometheus Scrape endpoint"""
 
-    relation_name: str = None
-
-    def __init__(self, charm: ops.charm.CharmBase, relation_name: str):
-        super().__init__(charm, relation_name)
-        self.relation_name = relation_name
-
     def publish_info(
         self,
         hostname: str,
@@ -97,25 +81,19 @@ class PrometheusScrapeTarget(ops.framework.Object):
         metrics_path: str,
         scrape_interval: str,
         scrape_timeout: str,
-    ) -> NoReturn:
-        if self.framework.model.unit.is_leader():
-            # Write the relation data in both app and unit data.
-            # This way we make sure it will work with https://code.launchpad.net/charm-prometheus2.
-            relation_data_targets = [
-                self.framework.model.app,
-                self.framework.model.unit,
-            ]
-            for relation in self.framework.model.relations[self.relation_name]:
-                for relation_data_target in relation_data_targets:
-                    relation.data[relation_data_target]["hostname"] = hostname
-                    relation.data[relation_data_target]["port"] = port
-                    relation.data[relation_data_target]["metrics_path"] = metrics_path
-                    relation.data[relation_data_target][
-                        "scrape_interval"
-                    ] = scrape_interval
-                    relation.data[relation_data_target][
-                        "scrape_timeout"
-                    ] = scrape_timeout
+    ) -> int:
+        # Write the relation data in both app and unit data.
+        # This way we make sure it will work with https://code.launchpad.net/charm-prometheus2.
+        return self.publish_data(
+            {
+                "hostname": hostname,
+                "port": port,
+                "metrics_path": metrics_path,
+                "scrape_interval": scrape_interval,
+                "scrape_timeout": scrape_timeout,
+            },
+            include_unit=True,
+        )
 
 
 class PrometheusScrapeServer(BaseRelationClient):
@@ -22,26 +22,17 @@ import ops.charm
 import ops.framework
 import ops.model
 
-from .common import BaseRelationClient
+from .common import BaseRelationClient, BaseRelationProvider
 
 
 logger = logging.getLogger(__name__)
 
 
-class ZookeeperServer(ops.framework.Object):
+class ZookeeperServer(BaseRelationProvider):
     """Provides side of a Zookeeper Endpoint"""
 
-    relation_name: str = None
-
-    def __init__(self, charm: ops.charm.CharmBase, relation_name: str):
-        super().__init__(charm, relation_name)
-        self.relation_name = relation_name
-
-    def publish_info(self, zookeeper_uri):
-        if self.framework.model.unit.is_leader():
-            for relation in self.framework.model.relations[self.relation_name]:
-                relation_data = relation.data[self.framework.model.app]
-                relation_data["zookeeper_uri"] = str(zookeeper_uri)
+    def publish_info(self, zookeeper_uri) -> int:
+        return self.publish_data({"zookeeper_uri": str(zookeeper_uri)})
 
 
 class ZookeeperClient(BaseRelationClient):
@@ -83,6 +74,7 @@ class ZookeeperCluster(BaseRelationClient):
             zookeeper_uri = ",".join(zookeepers)
             relation_data = event.relation.data[self.framework.model.app]
             relation_data["zookeeper_uri"] = str(zookeeper_uri)
+            self.invalidate_snapshot()
 
     @property
     def k8s_service_name(self):
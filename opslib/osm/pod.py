@@ -25,29 +25,103 @@ __all__ = [
     "FilesV3Builder",
     "ContainerV3Builder",
     "PodSpecV3Builder",
+    "PodRestartPolicy",
+    "index_kubernetes_resources",
+    "content_digest",
 ]
 
 
-from typing import Any, Dict, List, NoReturn, Set
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Mapping, NoReturn, Set, Tuple, Union
+
+
+from .templates import render_template
+from .utils import (
+    content_digest,
+    FILES_CACHE_SIZE,
+    freeze,
+    FrozenDict,
+    hash_from_dict,
+    index_list_by_key,
+    spec_hash,
+)
+
+
+@lru_cache(maxsize=FILES_CACHE_SIZE)
+def _file_spec(path: str, content_key: str, content: str, mode: int) -> FrozenDict:
+    # Identical files added by any builder share the same frozen dictionary,
+    # so they are kept once in memory and their spec hash is computed once.
+    file_spec = {"path": path, content_key: content}
+    if mode:
+        file_spec["mode"] = mode
+    return FrozenDict(file_spec)
+
+
+def _files_config_map(files: List[Dict], name: str = None) -> Tuple[str, Dict]:
+    """Get the name and the data of a config map with the content of some files"""
+    if any("content" not in file for file in files):
+        raise ValueError("secret files cannot be shared in a config map")
+    data = {content_digest(file["content"]): file["content"] for file in files}
+    if not name:
+        name = f"files-{content_digest(''.join(sorted(data)))}"
+    return name, data
+
+
+def _config_map_volume_config(
+    name: str, mount_path: str, config_map_name: str, files: List[Dict]
+) -> Dict:
+    """Get the volume config mounting some files from a config map"""
+    config_map_files = []
+    for file in files:
+        config_map_file = {"key": content_digest(file["content"]), "path": file["path"]}
+        if "mode" in file:
+            config_map_file["mode"] = file["mode"]
+        config_map_files.append(config_map_file)
+    return {
+        "name": name,
+        "mountPath": mount_path,
+        "configMap": {"name": config_map_name, "files": config_map_files},
+    }
+
 
+class IngressResourceV3Builder:
+    """
+    Ingress resource builder
 
-from .utils import find_in_list_with_key, hash_from_dict
+    The rules are indexed by host, so all the paths of a host end up in one rule,
+    and the hosts of the TLS entries by secret, so every host is listed once. The
+    rules, paths and TLS entries are built in a canonical order: the same ingress
+    gets the same spec hash no matter the order they were added in.
+    """
 
+    __slots__ = ("name", "annotations", "_rules", "_tls")
 
-class IngressResourceV3Builder:
     def __init__(self, name, annotations):
         self.name = name
         self.annotations = annotations
-        self._rules = []
-        self._tls = []
+        # Paths of every host, by path
+        self._rules = {}
+        # Hosts of every TLS secret
+        self._tls = {}
 
     @property
     def rules(self):
-        return self._rules
+        return [
+            {"host": host, "http": {"paths": [paths[path] for path in sorted(paths)]}}
+            for host, paths in sorted(self._rules.items())
+        ]
 
     @property
     def tls(self):
-        return self._tls
+        tls_entries = []
+        for secret_name, hosts in sorted(
+            self._tls.items(), key=lambda item: item[0] or ""
+        ):
+            tls = {"hosts": sorted(hosts)}
+            if secret_name:
+                tls["secretName"] = secret_name
+            tls_entries.append(tls)
+        return tls_entries
 
     @property
     def ingress_resource(self):
@@ -60,36 +134,74 @@ class IngressResourceV3Builder:
             r["spec"]["tls"] = self.tls
         return r
 
-    def add_rule(self, hostname: str, service_name, port, path: str = "/"):
-        # This function only supports one path per rule for simplicity
-        self._rules.append(
-            {
-                "host": hostname,
-                "http": {
-                    "paths": [
-                        {
-                            "path": path,
-                            "backend": {
-                                "serviceName": service_name,
-                                "servicePort": port,
-                            },
-                        }
-                    ]
-                },
-            }
-        )
+    def add_rule(
+        self,
+        hostname: str,
+        service_name,
+        port,
+        path: str = "/",
+        path_type: str = None,
+    ):
+        """
+        Add a path to the rule of a host
+
+        The path replaces the one of the host with the same path, if any.
+
+        :param: hostname: Host
+        :param: service_name: Name of the backend service
+        :param: port: Port of the backend service
+        :param: path: Path
+        :param: path_type: Path type: Exact, Prefix or ImplementationSpecific
+        """
+        path_spec = {
+            "path": path,
+            "backend": {
+                "serviceName": service_name,
+                "servicePort": port,
+            },
+        }
+        if path_type:
+            path_spec["pathType"] = path_type
+        self._rules.setdefault(hostname, {})[path] = path_spec
+
+    def add_rules(self, hostname: str, paths: Iterable[Tuple]):
+        """
+        Add several paths to the rule of a host
+
+        :param: hostname: Host
+        :param: paths: (service_name, port, path) or (service_name, port, path,
+                       path_type) tuples
+        """
+        for path in paths:
+            self.add_rule(hostname, *path)
 
     def add_tls(self, hosts, secret_name):
-        tls = {"hosts": hosts}
-        if secret_name:
-            tls["secretName"] = secret_name
-        self._tls.append(tls)
+        """
+        Add hosts to the TLS entry of a secret
+
+        Every host is listed once: a host already in the entry of another secret
+        is moved to this one.
+
+        :param: hosts: Hosts
+        :param: secret_name: Name of the TLS secret
+        """
+        for other_hosts in self._tls.values():
+            for host in hosts:
+                other_hosts.pop(host, None)
+        self._tls = {
+            other_secret_name: other_hosts
+            for other_secret_name, other_hosts in self._tls.items()
+            if other_hosts
+        }
+        self._tls.setdefault(secret_name, {}).update(dict.fromkeys(hosts))
 
     def build(self):
-        return self.ingress_resource
+        return freeze(self.ingress_resource)
 
 
 class FilesV3Builder:
+    __slots__ = ("_files",)
+
     def __init__(self):
         self._files = []
 
@@ -98,16 +210,72 @@ class FilesV3Builder:
         return self._files
 
     def add_file(self, path: str, content: str, mode: int = None, secret: bool = False):
-        file_spec = {"path": path, "content" if not secret else "key": content}
-        if mode:
-            file_spec.update({"mode": mode})
-        self._files.append(file_spec)
+        self._files.append(
+            _file_spec(path, "content" if not secret else "key", content, mode)
+        )
+
+    def add_template_file(
+        self,
+        path: str,
+        template: str,
+        variables: Dict[str, Any],
+        mode: int = None,
+        secret: bool = False,
+    ):
+        """
+        Add a file rendered from a template (see opslib.osm.templates.render_template)
+
+        :param: path: Path of the file
+        :param: template: Template, with $variable placeholders
+        :param: variables: Values of the variables
+        :param: mode: Mode of the file
+        :param: secret: Add the file as a secret file
+        """
+        self.add_file(path, render_template(template, variables), mode, secret)
+
+    def add_files(self, files: Iterable[Tuple], secret: bool = False):
+        """
+        Add several files
+
+        :param: files: (path, content) or (path, content, mode) tuples
+        :param: secret: Add the files as secret files
+        """
+        for file in files:
+            self.add_file(*file, secret=secret)
 
     def build(self):
-        return self.files
+        return freeze(self._files)
 
 
 class ContainerV3Builder:
+    """
+    Container builder
+
+    The builder keeps a frozen copy of every part of the container (ports, envs,
+    volumes, probes, ...) it built. On every build, each copy is compared with the
+    live part, which is cheaper than freezing and hashing it again, and replaced
+    only if they differ. So build() always reflects the current state, even if the
+    parts returned by the properties were modified, but it returns the same frozen
+    container while nothing changes, and the spec hash of the unchanged parts,
+    cached in them, is reused when the container or the pod spec is hashed.
+    """
+
+    __slots__ = (
+        "name",
+        "image_info",
+        "image_pull_policy",
+        "_security_context",
+        "_readiness_probe",
+        "_liveness_probe",
+        "_volume_config",
+        "_ports",
+        "_envs",
+        "_command",
+        "_frozen",
+        "_container",
+        "_container_key",
+    )
+
     def __init__(
         self,
         name,
@@ -123,6 +291,9 @@ class ContainerV3Builder:
                                  as root or not. If True, will run as non-root,
                                  if False, will run as root. Default=False.
         """
+        self._frozen = {}
+        self._container = None
+        self._container_key = None
         self.name = name
         self.image_info = image_info
         self.image_pull_policy = image_pull_policy
@@ -137,6 +308,12 @@ class ContainerV3Builder:
         self._envs = {}
         self._command = None
 
+    def _frozen_part(self, part: str, value: Any) -> Any:
+        frozen = self._frozen.get(part)
+        if frozen is None or frozen != value:
+            frozen = self._frozen[part] = freeze(value)
+        return frozen
+
     @property
     def security_context(self):
         return self._security_context
@@ -165,9 +342,23 @@ class ContainerV3Builder:
     def volume_config(self):
         return self._volume_config
 
+    @property
+    def fingerprint(self) -> str:
+        """Spec hash of the container, computed from the cached hashes of its parts"""
+        return spec_hash(self.build())
+
     def add_port(self, name, port, protocol="TCP"):
         self._ports.append({"name": name, "containerPort": port, "protocol": protocol})
 
+    def add_ports(self, ports: Iterable[Tuple]):
+        """
+        Add several ports
+
+        :param: ports: (name, port) or (name, port, protocol) tuples
+        """
+        for port in ports:
+            self.add_port(*port)
+
     def add_volume_config(self, name, mount_path, files, secret_name: str = None):
         volume_config = {
             "name": name,
@@ -179,6 +370,21 @@ class ContainerV3Builder:
             volume_config["files"] = files
         self._volume_config.append(volume_config)
 
+    def add_config_map_volume_config(
+        self, name: str, mount_path: str, config_map_name: str, files: List[Dict]
+    ):
+        """
+        Mount files shared with other containers (see PodSpecV3Builder.add_shared_files)
+
+        :param: name: Name of the volume
+        :param: mount_path: Path where the volume is mounted
+        :param: config_map_name: Name returned by PodSpecV3Builder.add_shared_files
+        :param: files: Files passed to PodSpecV3Builder.add_shared_files
+        """
+        self._volume_config.append(
+            _config_map_volume_config(name, mount_path, config_map_name, files)
+        )
+
     def add_command(self, command):
         self._command = command
 
@@ -325,34 +531,75 @@ class ContainerV3Builder:
     def add_env(self, key: str, value: str):
         self._envs[key] = value
 
-    def add_envs(self, envs: dict):
-        self._envs = {**self._envs, **envs}
+    def add_envs(self, envs: Union[Mapping[str, Any], Iterable[Tuple[str, Any]]]):
+        """
+        Add several envs
 
-    def add_secret_envs(self, secret_name: str, envs: dict):
-        new_secret_envs = {
-            k: {"secret": {"name": secret_name, "key": v}} for k, v in envs.items()
-        }
-        self._envs = {**self._envs, **new_secret_envs}
+        :param: envs: Dictionary, or (key, value) tuples
+        """
+        self._envs.update(envs)
+
+    def add_secret_envs(self, secret_name: str, envs: Mapping[str, str]):
+        self._envs.update(
+            (k, {"secret": {"name": secret_name, "key": v}}) for k, v in envs.items()
+        )
 
     def build(self):
+        """
+        Build the container
+
+        The result is frozen (see opslib.osm.utils.freeze), and the same object is
+        returned while the parts of the container do not change.
+        """
+        frozen_part = self._frozen_part
         container = {
             "name": self.name,
-            "imageDetails": self.image_info,
+            "imageDetails": frozen_part("imageDetails", self.image_info),
             "imagePullPolicy": self.image_pull_policy,
-            "ports": self.ports,
-            "envConfig": self.env_config,
-            "volumeConfig": self.volume_config,
+            "ports": frozen_part("ports", self._ports),
+            "envConfig": frozen_part("envConfig", self._envs),
+            "volumeConfig": frozen_part("volumeConfig", self._volume_config),
             "kubernetes": {
-                "securityContext": self.security_context,
+                "securityContext": frozen_part(
+                    "securityContext", self._security_context
+                ),
             },
         }
-        if self.command:
-            container["command"] = self.command
-        if self.readiness_probe:
-            container["kubernetes"]["readinessProbe"] = self.readiness_probe
-        if self.liveness_probe:
-            container["kubernetes"]["livenessProbe"] = self.liveness_probe
-        return container
+        if self._command:
+            container["command"] = frozen_part("command", self._command)
+        if self._readiness_probe:
+            container["kubernetes"]["readinessProbe"] = frozen_part(
+                "readinessProbe", self._readiness_probe
+            )
+        if self._liveness_probe:
+            container["kubernetes"]["livenessProbe"] = frozen_part(
+                "livenessProbe", self._liveness_probe
+            )
+        # The frozen parts are compared by identity first, so the check is cheap
+        container_key = tuple(container.items())
+        if self._container is None or container_key != self._container_key:
+            self._container = freeze(container)
+            self._container_key = container_key
+        return self._container
+
+
+def index_kubernetes_resources(pod_spec: Dict) -> Dict[str, Dict[str, Dict]]:
+    """
+    Index the kubernetes resources of a pod spec by type and name
+
+    If several resources of the same type have the same name, the last one is
+    indexed, as it is the one that prevails when the pod spec is applied.
+
+    :param: pod_spec: Pod spec
+
+    :return: Dictionary with the resource types (secrets, ingressResources...) as keys,
+             and dictionaries of the resources of that type, by name, as values.
+    """
+    return {
+        resource_type: index_list_by_key(resources, "name")
+        for resource_type, resources in pod_spec.get("kubernetesResources", {}).items()
+        if isinstance(resources, list)
+    }
 
 
 class PodRestartPolicy:
@@ -383,35 +630,49 @@ class PodRestartPolicy:
         )
 
     def _find_resources_with_name(
-        self, resources: Dict, resources_names: Set[str]
+        self,
+        resources: List[Dict],
+        resources_names: Set[str],
+        resources_by_name: Dict[str, Dict] = None,
     ) -> List[Any]:
+        if resources_by_name is None:
+            resources_by_name = index_list_by_key(resources, "name")
         resources_found = []
-        for name in resources_names:
-            resource = find_in_list_with_key(resources, key="name", value=name)
+        # Sorted, so the policy hash does not depend on the iteration order of the set
+        for name in sorted(resources_names):
+            resource = resources_by_name.get(name)
             if resource:
                 resources_found.append(resource)
         return resources_found
 
-    def policy_hash(self, pod_spec: Dict) -> str:
+    def policy_hash(
+        self, pod_spec: Dict, resources_index: Dict[str, Dict[str, Dict]] = None
+    ) -> str:
         """
         Return a hash of the Pod Spec taking into account the current policy.
         This means that for the hash, only the data included in the policy will be added
 
         :param: pod_spec: Pod spec
+        :param: resources_index: Kubernetes resources of the pod spec indexed by type
+                                 and name (see index_kubernetes_resources). It will be
+                                 built if not specified.
         """
-        spec = pod_spec.copy()
+        if resources_index is None:
+            resources_index = index_kubernetes_resources(pod_spec)
         policy_spec = {"kubernetesResources": {}}
 
         for resource_type, resource_names in self.default_policy[
             "kubernetesResources"
         ].items():
             if resource_names is True:
-                policy_spec["kubernetesResources"][resource_type] = spec[
+                policy_spec["kubernetesResources"][resource_type] = pod_spec[
                     "kubernetesResources"
                 ][resource_type]
             elif resource_names is not False:
                 resources_found = self._find_resources_with_name(
-                    spec["kubernetesResources"][resource_type], resource_names
+                    pod_spec["kubernetesResources"][resource_type],
+                    resource_names,
+                    resources_index.get(resource_type),
                 )
                 if resources_found:
                     policy_spec["kubernetesResources"][resource_type] = resources_found
@@ -419,6 +680,17 @@ class PodRestartPolicy:
 
 
 class PodSpecV3Builder:
+    __slots__ = (
+        "_init_containers",
+        "_containers",
+        "_ingress_resources",
+        "_security_context",
+        "_secrets",
+        "_restart_policy",
+        "_resources_index",
+        "_config_maps",
+    )
+
     def __init__(self, enable_security_context: bool = False):
         """
         :param: enable_security_context: Enable security context if True, disable it if False
@@ -439,6 +711,8 @@ class PodSpecV3Builder:
         )
         self._secrets = []
         self._restart_policy = None
+        self._resources_index = None
+        self._config_maps = {}
 
     @property
     def containers(self):
@@ -460,18 +734,43 @@ class PodSpecV3Builder:
     def secrets(self):
         return self._secrets
 
+    @property
+    def config_maps(self):
+        return self._config_maps
+
+    @property
+    def resources_index(self) -> Dict[str, Dict[str, Dict]]:
+        """Kubernetes resources indexed by type and name (see index_kubernetes_resources)"""
+        if self._resources_index is None:
+            self._resources_index = index_kubernetes_resources(self.pod_spec)
+        return self._resources_index
+
+    def find_resource(self, resource_type: str, name: str) -> Dict:
+        """
+        Find a kubernetes resource by name
+
+        :param: resource_type: Type of the resource (secrets, ingressResources...)
+        :param: name: Name of the resource
+
+        :return: The resource, or None if it is not found
+        """
+        return self.resources_index.get(resource_type, {}).get(name)
+
     @property
     def pod_spec(self):
-        return {
+        pod_spec = {
             "version": 3,
-            # "initContainers": self.init_containers,
-            "containers": self.containers,
+            # "initContainers": self._init_containers,
+            "containers": self._containers,
             "kubernetesResources": {
-                "ingressResources": self.ingress_resources,
-                "pod": {"securityContext": self.security_context},
-                "secrets": self.secrets,
+                "ingressResources": self._ingress_resources,
+                "pod": {"securityContext": self._security_context},
+                "secrets": self._secrets,
             },
         }
+        if self._config_maps:
+            pod_spec["configMaps"] = self._config_maps
+        return pod_spec
 
     def add_init_container(self, container):
         self._init_containers.append(container)
@@ -479,8 +778,35 @@ class PodSpecV3Builder:
     def add_container(self, container):
         self._containers.append(container)
 
+    def add_config_map(self, name: str, data: Dict[str, str]):
+        """
+        Add a config map to the Pod
+
+        :param: name: Name of the config map
+        :param: data: Dictionary with the content of the config map
+        """
+        self._config_maps[name] = data
+
+    def add_shared_files(self, files: List[Dict], name: str = None) -> str:
+        """
+        Add files that several containers mount, so their content is in the pod spec once
+
+        The files are stored in a config map, keyed by the digest of their content.
+        Mount them with ContainerV3Builder.add_config_map_volume_config.
+
+        :param: files: Files, as built by FilesV3Builder. Secret files are not supported.
+        :param: name: Name of the config map. Default: derived from the content, so a
+                      change in the files changes the volumes of the containers.
+
+        :return: The name of the config map
+        """
+        name, data = _files_config_map(files, name)
+        self.add_config_map(name, data)
+        return name
+
     def add_ingress_resource(self, ingress_resource):
         self._ingress_resources.append(ingress_resource)
+        self._resources_index = None
 
     def set_security_context_run_as_user(self, user_id: int):
         self._security_context.update({"runAsUser": user_id})
@@ -516,11 +842,27 @@ class PodSpecV3Builder:
                 "data" if base64_encoded else "stringData": content,
             }
         )
+        self._resources_index = None
 
     def build(self):
+        """
+        Build the pod spec
+
+        The builder is not modified, so it can be built again. The result is frozen
+        (see opslib.osm.utils.freeze); thaw it to get a mutable copy.
+        """
         pod_spec = self.pod_spec
+        pod_spec["kubernetesResources"] = freeze(pod_spec["kubernetesResources"])
+        self._resources_index = index_kubernetes_resources(pod_spec)
         if self._restart_policy:
-            policy_hash = self._restart_policy.policy_hash(pod_spec)
-            for container in pod_spec["containers"]:
-                container["envConfig"]["policyHash"] = policy_hash
-        return self.pod_spec
+            policy_hash = self._restart_policy.policy_hash(
+                pod_spec, self._resources_index
+            )
+            pod_spec["containers"] = [
+                {
+                    **container,
+                    "envConfig": {**container["envConfig"], "policyHash": policy_hash},
+                }
+                for container in pod_spec["containers"]
+            ]
+        return freeze(pod_spec)
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# Copyright 2021 Canonical Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# For those usages not covered by the Apache License, Version 2.0 please
+# contact: legal@canonical.com
+#
+# To get in touch with the maintainers, please contact:
+# osm-charmers@lists.launchpad.net
+##
+
+
+__all__ = [
+    "HookProfiler",
+    "parse_profile_modes",
+    "PROFILE_MODES",
+    "PSTATS_SUFFIX",
+    "ALLOCATIONS_SUFFIX",
+]
+
+
+import cProfile
+from pathlib import Path
+import time
+import tracemalloc
+from typing import List, Optional, Set
+
+PROFILE_MODES = ("cpu", "memory")
+
+PSTATS_SUFFIX = ".pstats"
+ALLOCATIONS_SUFFIX = ".allocations.txt"
+
+
+def parse_profile_modes(value: Optional[str]) -> Set[str]:
+    """
+    Get the profiling modes enabled by a toggle value
+
+    :param: value: Comma separated modes ("cpu", "memory"), or "all". Any other
+                   value is ignored, so an empty or "false" value disables profiling.
+    """
+    modes = {mode.strip().lower() for mode in (value or "").split(",")}
+    if "all" in modes or "true" in modes:
+        return set(PROFILE_MODES)
+    return modes.intersection(PROFILE_MODES)
+
+
+class HookProfiler:
+    """
+    CPU (cProfile) and memory (tracemalloc) profiler of a hook
+
+    The profiles of the last hooks are kept in a directory: a pstats file for the
+    CPU profile, and a report with the top allocations for the memory profile.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        modes: Set[str],
+        max_profiles: int = 5,
+        top_allocations: int = 25,
+    ):
+        """
+        :param: directory: Directory where the profiles are written
+        :param: modes: Profiling modes (see PROFILE_MODES)
+        :param: max_profiles: Number of hooks whose profiles are kept
+        :param: top_allocations: Number of allocation sites in the memory report
+        """
+        self.directory = Path(directory)
+        self.modes = modes
+        self.max_profiles = max_profiles
+        self.top_allocations = top_allocations
+        self._profile = None
+        self._started_tracemalloc = False
+
+    def start(self):
+        if "memory" in self.modes and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        if "cpu" in self.modes:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+
+    def stop(self, hook: Optional[str] = None) -> List[Path]:
+        """
+        Stop profiling and write the profiles
+
+        :param: hook: Name of the profiled hook, used in the file names
+
+        :return: Paths of the files written
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        prefix = f"{_timestamp()}-{hook or 'hook'}"
+        written = []
+        if self._profile:
+            self._profile.disable()
+            pstats_path = self.directory / f"{prefix}{PSTATS_SUFFIX}"
+            self._profile.dump_stats(str(pstats_path))
+            self._profile = None
+            written.append(pstats_path)
+        if tracemalloc.is_tracing() and "memory" in self.modes:
+            allocations_path = self.directory / f"{prefix}{ALLOCATIONS_SUFFIX}"
+            allocations_path.write_text(self._allocations_report())
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+                self._started_tracemalloc = False
+            written.append(allocations_path)
+        self.rotate()
+        return written
+
+    def _allocations_report(self) -> str:
+        current, peak = tracemalloc.get_traced_memory()
+        statistics = tracemalloc.take_snapshot().statistics("lineno")
+        lines = [
+            f"current: {current / 1024:.1f} KiB, peak: {peak / 1024:.1f} KiB",
+            f"top {self.top_allocations} allocation sites:",
+        ]
+        lines.extend(str(stat) for stat in statistics[: self.top_allocations])
+        return "\n".join(lines) + "\n"
+
+    def profiles(self) -> List[Path]:
+        """Profile files in the directory, from the oldest to the newest"""
+        if not self.directory.is_dir():
+            return []
+        return sorted(
+            path
+            for path in self.directory.iterdir()
+            if path.name.endswith((PSTATS_SUFFIX, ALLOCATIONS_SUFFIX))
+        )
+
+    def rotate(self):
+        """Remove the profiles of the oldest hooks, keeping the last max_profiles"""
+        prefixes = sorted({_profile_prefix(path) for path in self.profiles()})
+        if len(prefixes) <= self.max_profiles:
+            return
+        outdated = set(prefixes[: len(prefixes) - self.max_profiles])
+        for path in self.profiles():
+            if _profile_prefix(path) in outdated:
+                path.unlink()
+
+
+def _timestamp() -> str:
+    """UTC timestamp with nanoseconds, so the profiles sort chronologically"""
+    now = time.time_ns()
+    seconds = time.strftime("%Y%m%dT%H%M%S", time.gmtime(now // 10 ** 9))
+    return f"{seconds}.{now % 10 ** 9:09d}"
+
+
+def _profile_prefix(path: Path) -> str:
+    for suffix in (PSTATS_SUFFIX, ALLOCATIONS_SUFFIX):
+        if path.name.endswith(suffix):
+            return path.name[: -len(suffix)]
+    return path.name
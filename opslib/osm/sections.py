@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# Copyright 2021 Canonical Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# For those usages not covered by the Apache License, Version 2.0 please
+# contact: legal@canonical.com
+#
+# To get in touch with the maintainers, please contact:
+# osm-charmers@lists.launchpad.net
+##
+
+
+__all__ = ["PodSpecSection", "SECTION_KINDS", "SectionCache", "SECTION_CACHE_SIZE"]
+
+
+import json
+import logging
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Mapping, NamedTuple, Optional, Tuple
+from urllib.parse import quote
+
+from .pod import PodSpecV3Builder
+from .utils import freeze
+
+logger = logging.getLogger(__name__)
+
+# Maximum size, in bytes, of the results kept by a SectionCache
+SECTION_CACHE_SIZE = 16 * 1024 * 1024
+
+
+def _add_config_maps(builder: PodSpecV3Builder, config_maps: Mapping[str, Dict]):
+    for name, data in config_maps.items():
+        builder.add_config_map(name, data)
+
+
+def _add_secret(builder: PodSpecV3Builder, secret: Mapping[str, Any]):
+    base64_encoded = "data" in secret
+    builder.add_secret(
+        secret["name"],
+        secret["data" if base64_encoded else "stringData"],
+        base64_encoded,
+        secret.get("type", "Opaque"),
+    )
+
+
+# How the result of every kind of section is added to the pod spec.
+# The result of a "files" section is not added; it is used by other sections.
+SECTION_KINDS: Dict[str, Callable[[PodSpecV3Builder, Any], None]] = {
+    "container": lambda builder, container: builder.add_container(container),
+    "ingress": lambda builder, ingress: builder.add_ingress_resource(ingress),
+    "secret": _add_secret,
+    "config_maps": _add_config_maps,
+    "files": lambda builder, files: None,
+}
+
+
+class PodSpecSection(NamedTuple):
+    """
+    Part of the pod spec, built from explicit inputs
+
+    The build function receives a dictionary with the inputs of the section:
+        config: values of the config keys of the section
+        relations: values of the fields of every relation client of the section
+        image_info: image info details, if the section uses the image
+        sections: results of the sections this one depends on
+    It returns the part of the pod spec, as the builders do: the container, the
+    ingress resource, the secret, the config maps by name, or the list of files.
+    """
+
+    name: str
+    kind: str
+    build: Callable[[Dict[str, Any]], Any]
+    config: Tuple[str, ...] = ()
+    # Attribute names of the relation clients of the charm, and their fields
+    relations: Mapping[str, Tuple[str, ...]] = {}
+    image: bool = False
+    sections: Tuple[str, ...] = ()
+    # Whether the result can be kept in the section cache of the charm
+    cache: bool = True
+
+
+class SectionCache:
+    """
+    Results of the sections, kept in the files of a local directory
+
+    Every result is stored along with the digest of the inputs it was built from.
+    When the size of the files exceeds max_size, the least recently written ones
+    are removed; results bigger than max_size are not kept.
+    """
+
+    def __init__(self, directory: Path, max_size: int = SECTION_CACHE_SIZE):
+        """
+        :param: directory: Directory where the results are written
+        :param: max_size: Maximum size, in bytes, of the files in the directory
+        """
+        self.directory = Path(directory)
+        self.max_size = max_size
+
+    def _path(self, name: str) -> Path:
+        return self.directory / f"{quote(name, safe='')}.json"
+
+    def get(self, name: str, digest: str) -> Optional[Any]:
+        """
+        Get the result of a section
+
+        :param: name: Name of the section
+        :param: digest: Digest of the inputs of the section
+
+        :return: The frozen result, or None if it is not kept for those inputs
+        """
+        try:
+            stored = json.loads(self._path(name).read_text())
+        except (OSError, ValueError):
+            return None
+        if stored.get("digest") != digest:
+            return None
+        return freeze(stored["result"])
+
+    def put(self, name: str, digest: str, result: Any) -> bool:
+        """
+        Keep the result of a section
+
+        :param: name: Name of the section
+        :param: digest: Digest of the inputs of the section
+        :param: result: Result of the section. It must be JSON serializable.
+
+        :return: Whether the result was kept
+        """
+        try:
+            content = json.dumps({"digest": digest, "result": result})
+        except TypeError:
+            logger.debug(f"section {name} is not JSON serializable, it is not cached")
+            return False
+        path = self._path(name)
+        try:
+            if len(content) > self.max_size:
+                path.unlink(missing_ok=True)
+                return False
+            # The parent directory is not created: without it, nothing is cached
+            self.directory.mkdir(exist_ok=True)
+            path.touch(mode=0o600)
+            path.write_text(content)
+            self._evict(keep=path)
+        except OSError as e:
+            logger.debug(f"section {name} cannot be cached: {e}")
+            return False
+        return True
+
+    def _evict(self, keep: Path):
+        """Remove the oldest files until the size of the directory is below max_size"""
+        files = sorted(
+            (path.stat().st_mtime_ns, path.stat().st_size, path)
+            for path in self.directory.glob("*.json")
+        )
+        total_size = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if total_size <= self.max_size:
+                break
+            if path != keep:
+                path.unlink(missing_ok=True)
+                total_size -= size
+
+    def discard(self, names: Iterable[str]):
+        """Remove the results of some sections"""
+        for name in names:
+            self._path(name).unlink(missing_ok=True)
+
+    def clear(self):
+        """Remove all the results"""
+        if self.directory.is_dir():
+            for path in self.directory.glob("*.json"):
+                path.unlink(missing_ok=True)
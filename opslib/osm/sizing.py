@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# Copyright 2021 Canonical Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# For those usages not covered by the Apache License, Version 2.0 please
+# contact: legal@canonical.com
+#
+# To get in touch with the maintainers, please contact:
+# osm-charmers@lists.launchpad.net
+##
+
+
+__all__ = [
+    "measure_pod_spec",
+    "check_pod_spec_size",
+    "PodSpecSize",
+    "SizeBudget",
+]
+
+
+import json
+from typing import Any, Dict, List, Mapping, NamedTuple
+
+KiB = 1024
+
+
+class SizeBudget(NamedTuple):
+    """
+    Size thresholds of a pod spec, in bytes
+
+    Kubernetes objects, including the config maps and secrets created from the pod
+    spec, cannot exceed 1 MiB, and large specs are slow to store and apply. The
+    budget only reports the parts exceeding it; reducing them is up to the charm.
+    """
+
+    max_total: int = 768 * KiB
+    max_container: int = 512 * KiB
+    max_file: int = 256 * KiB
+    max_secret: int = 256 * KiB
+    max_config_map: int = 512 * KiB
+
+
+class PodSpecSize(NamedTuple):
+    """Serialized size, in bytes, of a pod spec and its parts"""
+
+    total: int
+    # By container name
+    containers: Dict[str, int]
+    # By "<container>/<volume>"
+    volumes: Dict[str, int]
+    # By "<container>/<volume>/<path>", content only
+    files: Dict[str, int]
+    # By secret name
+    secrets: Dict[str, int]
+    # By config map name
+    config_maps: Dict[str, int]
+
+    def summary(self, top: int = 5) -> str:
+        """Concise, human readable description of the size and its largest parts"""
+        parts = [
+            (name, size)
+            for sizes in (self.containers, self.volumes, self.secrets, self.config_maps)
+            for name, size in sizes.items()
+        ]
+        largest = sorted(parts, key=lambda part: part[1], reverse=True)[:top]
+        return f"{self.total} bytes; largest: " + ", ".join(
+            f"{name} ({size} bytes)" for name, size in largest
+        )
+
+
+def _size(obj: Any) -> int:
+    return len(json.dumps(obj, separators=(",", ":")).encode())
+
+
+def _volume_files(volume: Mapping[str, Any]) -> List[Mapping[str, Any]]:
+    if "files" in volume:
+        return volume["files"]
+    if "secret" in volume:
+        return volume["secret"].get("files", [])
+    return []
+
+
+def measure_pod_spec(pod_spec: Mapping[str, Any]) -> PodSpecSize:
+    """
+    Measure the serialized size of a pod spec and its parts
+
+    :param: pod_spec: Pod spec
+    """
+    containers, volumes, files = {}, {}, {}
+    for container in [
+        *pod_spec.get("initContainers", []),
+        *pod_spec.get("containers", []),
+    ]:
+        containers[container["name"]] = _size(container)
+        for volume in container.get("volumeConfig", []):
+            volume_name = f"{container['name']}/{volume['name']}"
+            volumes[volume_name] = _size(volume)
+            for file in _volume_files(volume):
+                if "content" in file:
+                    files[f"{volume_name}/{file['path']}"] = len(
+                        file["content"].encode()
+                    )
+    kubernetes_resources = pod_spec.get("kubernetesResources", {})
+    return PodSpecSize(
+        total=_size(pod_spec),
+        containers=containers,
+        volumes=volumes,
+        files=files,
+        secrets={
+            secret["name"]: _size(secret)
+            for secret in kubernetes_resources.get("secrets", [])
+        },
+        config_maps={
+            name: _size(data) for name, data in pod_spec.get("configMaps", {}).items()
+        },
+    )
+
+
+def check_pod_spec_size(size: PodSpecSize, budget: SizeBudget) -> List[str]:
+    """
+    Check the size of a pod spec against a budget
+
+    :param: size: Size of the pod spec (see measure_pod_spec)
+    :param: budget: Size thresholds
+
+    :return: Warnings for the pod spec and the parts exceeding the thresholds
+    """
+    warnings = []
+    if size.total > budget.max_total:
+        warnings.append(f"pod spec is {size.total} bytes (max {budget.max_total})")
+    for kind, sizes, max_size in (
+        ("container", size.containers, budget.max_container),
+        ("file", size.files, budget.max_file),
+        ("secret", size.secrets, budget.max_secret),
+        ("config map", size.config_maps, budget.max_config_map),
+    ):
+        for name, part_size in sizes.items():
+            if part_size > max_size:
+                warnings.append(f"{kind} {name} is {part_size} bytes (max {max_size})")
+    return warnings
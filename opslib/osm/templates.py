@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# Copyright 2021 Canonical Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# For those usages not covered by the Apache License, Version 2.0 please
+# contact: legal@canonical.com
+#
+# To get in touch with the maintainers, please contact:
+# osm-charmers@lists.launchpad.net
+##
+
+
+__all__ = ["compile_template", "render_template"]
+
+
+from collections import OrderedDict
+from functools import lru_cache
+from string import Template
+from typing import Any, Mapping, Tuple
+
+from .utils import content_digest, spec_hash
+
+# Number of templates kept compiled
+TEMPLATES_CACHE_SIZE = 64
+# Number of rendered templates kept
+RENDERS_CACHE_SIZE = 256
+
+_renders: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+
+
+@lru_cache(maxsize=TEMPLATES_CACHE_SIZE)
+def compile_template(source: str) -> Template:
+    """
+    Get a compiled template
+
+    Every template is compiled once per process.
+
+    :param: source: Template, with $variable placeholders (see string.Template)
+    """
+    return Template(source)
+
+
+def render_template(source: str, variables: Mapping[str, Any]) -> str:
+    """
+    Render a template
+
+    The output is memoized by the template and a digest of the variables, so an
+    unchanged render returns the same string, whose content digest (see
+    content_digest) is already computed.
+
+    :param: source: Template, with $variable placeholders (see string.Template)
+    :param: variables: Values of the variables
+
+    :return: The rendered template
+    """
+    try:
+        key = (source, spec_hash(variables))
+    except TypeError:
+        # Variables that cannot be hashed, the render is not memoized
+        return compile_template(source).substitute(variables)
+    content = _renders.get(key)
+    if content is None:
+        content = compile_template(source).substitute(variables)
+        content_digest(content)
+        _renders[key] = content
+        if len(_renders) > RENDERS_CACHE_SIZE:
+            _renders.popitem(last=False)
+    else:
+        _renders.move_to_end(key)
+    return content
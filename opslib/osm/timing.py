@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# Copyright 2021 Canonical Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# For those usages not covered by the Apache License, Version 2.0 please
+# contact: legal@canonical.com
+#
+# To get in touch with the maintainers, please contact:
+# osm-charmers@lists.launchpad.net
+##
+
+
+__all__ = ["HookTimer"]
+
+
+from contextlib import contextmanager, nullcontext
+import time
+from typing import ContextManager, Dict, Optional
+
+# Returned by disabled timers, so an unused span costs a method call
+_NULL_SPAN = nullcontext()
+
+
+class HookTimer:
+    """
+    Timing spans of a hook
+
+    Spans with the same name are accumulated. When the timer is disabled,
+    spans are not measured at all.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.spans: Dict[str, float] = {}
+        self._start = time.perf_counter()
+
+    def span(self, name: str) -> ContextManager:
+        """
+        Measure the time spent in a block of code
+
+        :param: name: Name of the span
+
+        Usage:
+            with timer.span("render-dashboard"):
+                ...
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return self._measure(name)
+
+    @contextmanager
+    def _measure(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.spans[name] = self.spans.get(name, 0.0) + time.perf_counter() - start
+
+    def record(self, hook: Optional[str] = None) -> Dict:
+        """
+        Get the spans measured so far, in milliseconds
+
+        :param: hook: Name of the hook the spans were measured in
+        """
+        return {
+            "hook": hook,
+            "total_ms": round((time.perf_counter() - self._start) * 1000, 3),
+            "spans_ms": {
+                name: round(seconds * 1000, 3) for name, seconds in self.spans.items()
+            },
+        }
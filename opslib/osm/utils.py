@@ -1,9 +1,28 @@
-__all__ = ["hash_from_dict"]
+__all__ = [
+    "hash_from_dict",
+    "index_list_by_key",
+    "spec_hash",
+    "freeze",
+    "thaw",
+    "FrozenDict",
+    "FrozenList",
+    "SPEC_HASH_PREFIX",
+    "content_digest",
+]
 
+from functools import lru_cache
 import hashlib
 import json
 from typing import Any, Dict, List
 
+import yaml
+from yaml.representer import SafeRepresenter
+
+SPEC_HASH_PREFIX = "blake2b:"
+
+# Number of distinct file payloads whose digest, or file spec, is remembered
+FILES_CACHE_SIZE = 512
+
 
 def hash_from_dict(dict: Dict[str, Any]) -> str:
     """Get a hash from a dictionary"""
@@ -12,9 +31,170 @@ def hash_from_dict(dict: Dict[str, Any]) -> str:
     return result.hexdigest()
 
 
+@lru_cache(maxsize=FILES_CACHE_SIZE)
+def content_digest(content: str) -> str:
+    """Get the digest identifying the content of a file"""
+    return hashlib.blake2b(content.encode(), digest_size=8).hexdigest()
+
+
 def find_in_list_with_key(list: List[Dict[str, Any]], key: str, value: str) -> Any:
-    found_item = None
-    for item in list:
+    """
+    Find an item of a list by the value of one of its keys
+
+    If several items match, the last one is returned.
+    """
+    for item in reversed(list):
         if key in item and item[key] == value:
-            found_item = item
-    return found_item
+            return item
+
+
+def index_list_by_key(list: List[Dict[str, Any]], key: str) -> Dict[Any, Any]:
+    """
+    Index the items of a list by the value of one of its keys
+
+    Items without the key are left out. If several items have the same value,
+    the last one is indexed, like find_in_list_with_key does.
+    """
+    return {item[key]: item for item in list if key in item}
+
+
+def _immutable(self, *args, **kwargs):
+    raise TypeError(f"{type(self).__name__} object is immutable")
+
+
+class FrozenDict(dict):
+    """
+    Immutable dictionary
+
+    Its values are frozen recursively, so the spec hash of the whole
+    dictionary can be computed once and cached.
+    """
+
+    __slots__ = ("_spec_digest",)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(
+            (key, freeze(value)) for key, value in dict(*args, **kwargs).items()
+        )
+        self._spec_digest = None
+
+    def __reduce__(self):
+        return (type(self), (dict(self),))
+
+    __setitem__ = __delitem__ = __ior__ = _immutable
+    clear = pop = popitem = setdefault = update = _immutable
+
+
+class FrozenList(list):
+    """
+    Immutable list
+
+    Its items are frozen recursively, so the spec hash of the whole
+    list can be computed once and cached.
+    """
+
+    __slots__ = ("_spec_digest",)
+
+    def __init__(self, iterable=()):
+        super().__init__(freeze(item) for item in iterable)
+        self._spec_digest = None
+
+    def __reduce__(self):
+        return (type(self), (list(self),))
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _immutable
+    append = clear = extend = insert = pop = remove = reverse = sort = _immutable
+
+
+# The frozen types are dumped like plain dicts and lists by the safe dumpers, the
+# ones ops uses to write the pod spec, so the output of the builders can be passed
+# to pod.set_spec directly.
+for _dumper in (yaml.SafeDumper, getattr(yaml, "CSafeDumper", None)):
+    if _dumper:
+        _dumper.add_representer(FrozenDict, SafeRepresenter.represent_dict)
+        _dumper.add_representer(FrozenList, SafeRepresenter.represent_list)
+
+
+def freeze(obj: Any) -> Any:
+    """Get an immutable copy of a pod spec fragment"""
+    if isinstance(obj, (FrozenDict, FrozenList)):
+        return obj
+    if isinstance(obj, dict):
+        return FrozenDict(obj)
+    if isinstance(obj, (list, tuple)):
+        return FrozenList(obj)
+    return obj
+
+
+def thaw(obj: Any) -> Any:
+    """Get a mutable copy, made of plain dicts and lists, of a pod spec fragment"""
+    if isinstance(obj, dict):
+        return {key: thaw(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [thaw(item) for item in obj]
+    return obj
+
+
+class _SpecHasher:
+    """
+    Merkle-style hasher for pod specs
+
+    Dictionaries and lists are digested from the digests of their children,
+    so no serialized copy of the spec is ever built. The digest of a frozen
+    fragment is stored in the fragment, and the digest of any other
+    dictionary or list is reused if it appears again in the same spec.
+    """
+
+    def __init__(self):
+        self._memo = {}
+
+    def digest(self, obj: Any) -> bytes:
+        if isinstance(obj, (FrozenDict, FrozenList)):
+            if obj._spec_digest is None:
+                obj._spec_digest = self._digest_container(obj)
+            return obj._spec_digest
+        key = id(obj)
+        if key not in self._memo:
+            self._memo[key] = self._digest_container(obj)
+        return self._memo[key]
+
+    def _digest_container(self, obj: Any) -> bytes:
+        h = hashlib.blake2b(digest_size=16)
+        if isinstance(obj, dict):
+            h.update(b"{")
+            for key in sorted(obj):
+                h.update(self._encode(key))
+                h.update(self._encode(obj[key]))
+        elif isinstance(obj, (list, tuple)):
+            h.update(b"[")
+            for item in obj:
+                h.update(self._encode(item))
+        else:
+            raise TypeError(f"Object of type {type(obj).__name__} cannot be hashed")
+        return h.digest()
+
+    def _encode(self, value: Any) -> bytes:
+        if isinstance(value, str):
+            data = value.encode()
+            return b"s%d:" % len(data) + data
+        if value is None:
+            return b"n"
+        if value is True:
+            return b"t"
+        if value is False:
+            return b"f"
+        if isinstance(value, int):
+            return b"i%d;" % value
+        if isinstance(value, float):
+            return b"r" + repr(value).encode() + b";"
+        return b"h" + self.digest(value)
+
+
+def spec_hash(obj: Any) -> str:
+    """
+    Get a hash from a pod spec, or any fragment of it
+
+    Faster than hash_from_dict, but not compatible with it: the result
+    is prefixed with SPEC_HASH_PREFIX so both can be told apart.
+    """
+    return SPEC_HASH_PREFIX + _SpecHasher().digest(obj).hex()
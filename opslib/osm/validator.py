@@ -1,13 +1,47 @@
+from collections import Counter
 from collections.abc import Iterable
-from typing import Any, List, Union
+from concurrent.futures import ProcessPoolExecutor
+import functools
+import itertools
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable as IterableType,
+    Iterator,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
 
 from typing_inspect import get_args, get_origin
 
-__all__ = ["ValidationError", "ModelValidator", "AttributeErrorTypes", "validator"]
+from .utils import spec_hash
+
+__all__ = [
+    "ValidationError",
+    "ModelValidator",
+    "AttributeErrorTypes",
+    "validator",
+    "schema_version",
+    "validate_batch",
+    "BatchValidationReport",
+    "ValidationResult",
+    "ROOT_ATTRIBUTE",
+]
+
+# Number of configs validated by a worker process at a time
+BATCH_CHUNK_SIZE = 500
+# Attribute name of the errors of a batch config that is not a mapping
+ROOT_ATTRIBUTE = "__root__"
 
 
 def validator(argument):
     def call(function):
+        @functools.wraps(function)
         def wrapper(argument):
             result = function(ModelValidator, argument)
             return result
@@ -54,7 +88,20 @@ class ValidationError(Exception):
         return "Errors found in: {}".format(", ".join([self.attribute_errors.keys()]))
 
 
+class _AttributeSchema(NamedTuple):
+    name: str
+    checker: Callable[[Any], None]
+    optional: bool
+    validator: Optional[Callable[[Any], Any]]
+
+
 class ModelValidator:
+    __schema__ = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.__schema__ = _compile_schema(cls)
+
     def __init__(self, **data: Any):
         data = {k.replace("-", "_"): v for k, v in data.items()}
 
@@ -65,54 +112,255 @@ class ModelValidator:
 
         setattr(self, "__dict__", values)
 
+    @classmethod
+    def construct(cls, **values: Any):
+        """
+        Create a model from values that were already validated, without validating them
 
-def validate_model(model, data):
-    validation_exceptions = []
-    model_attributes = getattr(model, "__annotations__")
+        :param: values: Values returned by validate_model
+        """
+        model = cls.__new__(cls)
+        setattr(model, "__dict__", dict(values))
+        return model
+
+
+def _compile_schema(model) -> Tuple[_AttributeSchema, ...]:
+    """
+    Compile the validation plan of a model
+
+    The plan is computed once per class, when the class is created, and
+    reused by validate_model on every instantiation.
+    """
+    model_attributes = getattr(model, "__annotations__", {})
     __decorator_validators__ = {
         validator.argument: validator
         for validator in model.__dict__.values()
         if hasattr(validator, "decorator")
     }
-    error = None
-    values = {}
-    # extra_attributes = [key for key in data if key not in model_attributes]
-    # if extra_attributes:
-    #     for extra_attr in extra_attributes:
-    #         validation_exceptions.append(
-    #             AttributeError(extra_attr, AttributeErrorTypes.UNDEFINED)
-    #         )
-
-    for attr_name, attr_type in model_attributes.items():
-        optional = _is_optional_type(attr_type)
-        type_to_check = _safe_get_type(attr_type)
-        args_type = _safe_get_args(attr_type)
-
-        data_value = data.get(attr_name)
-        if data_value is None and not optional:
-            validation_exceptions.append(
-                AttributeError(attr_name, AttributeErrorTypes.MISSING)
-            )
+    return tuple(
+        _AttributeSchema(
+            name=attr_name,
+            checker=_compile_checker(attr_type),
+            optional=_is_optional_type(attr_type),
+            validator=__decorator_validators__.get(attr_name),
+        )
+        for attr_name, attr_type in model_attributes.items()
+    )
+
+
+def _get_schema(model) -> Tuple[_AttributeSchema, ...]:
+    if "__schema__" not in model.__dict__:
+        setattr(model, "__schema__", _compile_schema(model))
+    return model.__schema__
+
+
+def schema_version(model) -> str:
+    """
+    Get a digest of the schema of a model
+
+    It changes when an attribute, its type or its validator are changed, so
+    validation results stored for a version of the model can be told apart.
+    """
+    return spec_hash(
+        [
+            model.__module__,
+            model.__qualname__,
+            [
+                [
+                    attribute.name,
+                    repr(getattr(model, "__annotations__")[attribute.name]),
+                    attribute.validator.__qualname__ if attribute.validator else None,
+                ]
+                for attribute in _get_schema(model)
+            ],
+        ]
+    )
+
+
+def _apply_schema(
+    schema: Tuple[_AttributeSchema, ...], data: Dict[str, Any]
+) -> Tuple[Dict[str, Any], List[Tuple[str, str]]]:
+    """Validate data with a compiled schema; return the values and the errors"""
+    errors = []
+    for attribute in schema:
+        data_value = data.get(attribute.name)
+        if data_value is None and not attribute.optional:
+            errors.append((attribute.name, AttributeErrorTypes.MISSING))
         else:
-            error_msg = ""
             try:
-                _validate(data_value, type_to_check, args_type)
-                if attr_name in __decorator_validators__:
-                    data[attr_name] = __decorator_validators__[attr_name](data_value)
+                if data_value is not None:
+                    attribute.checker(data_value)
+                if attribute.validator:
+                    data[attribute.name] = attribute.validator(data_value)
             except Exception as e:
-                error_msg = str(e)
-                validation_exceptions.append(AttributeError(attr_name, error_msg))
-                continue
-    if validation_exceptions:
-        error = ValidationError(exceptions=validation_exceptions)
-    else:
-        values.update(
-            {attr_name: data.get(attr_name) for attr_name in model_attributes}
-        )
+                errors.append((attribute.name, str(e)))
+    if errors:
+        return {}, errors
+    return {attribute.name: data.get(attribute.name) for attribute in schema}, errors
 
+
+def validate_model(model, data):
+    values, errors = _apply_schema(_get_schema(model), data)
+    error = None
+    if errors:
+        error = ValidationError(
+            exceptions=[AttributeError(name, message) for name, message in errors]
+        )
     return values, error
 
 
+class ValidationResult(NamedTuple):
+    """Result of the validation of one of the configs of a batch"""
+
+    values: Dict[str, Any]
+    error: Optional[ValidationError]
+
+    @property
+    def valid(self) -> bool:
+        return self.error is None
+
+
+class BatchValidationReport(NamedTuple):
+    """Results of the validation of a batch of configs"""
+
+    # Result of every config, in the order they were given
+    results: List[ValidationResult]
+    # Number of errors of every attribute, by error message
+    attribute_errors: Dict[str, Dict[str, int]]
+
+    @property
+    def total(self) -> int:
+        return len(self.results)
+
+    @property
+    def valid(self) -> int:
+        return sum(1 for result in self.results if result.valid)
+
+    @property
+    def invalid(self) -> int:
+        return self.total - self.valid
+
+
+def _validate_chunk(
+    model, configs: List[Mapping[str, Any]]
+) -> List[Tuple[Dict[str, Any], List[Tuple[str, str]]]]:
+    # Errors are returned as tuples, because the exceptions cannot be pickled
+    schema = _get_schema(model)
+    outcomes = []
+    for config in configs:
+        if isinstance(config, Mapping):
+            data = {
+                k.replace("-", "_") if isinstance(k, str) else k: v
+                for k, v in config.items()
+            }
+            outcomes.append(_apply_schema(schema, data))
+        else:
+            outcomes.append(({}, [(ROOT_ATTRIBUTE, AttributeErrorTypes.INVALID_TYPE)]))
+    return outcomes
+
+
+def _chunks(items: IterableType[Any], size: int) -> Iterator[List[Any]]:
+    iterator = iter(items)
+    chunk = list(itertools.islice(iterator, size))
+    while chunk:
+        yield chunk
+        chunk = list(itertools.islice(iterator, size))
+
+
+def validate_batch(
+    model,
+    configs: IterableType[Mapping[str, Any]],
+    processes: Optional[int] = None,
+    chunk_size: int = BATCH_CHUNK_SIZE,
+) -> BatchValidationReport:
+    """
+    Validate many configs with a model, without raising
+
+    Every config is validated like ModelValidator does, with the compiled schema of
+    the model, and the configs are not modified.
+
+    :param: model: ModelValidator subclass. To use several processes, it must be
+                   importable, and its validators must return values that can be
+                   pickled.
+    :param: configs: Configs to validate
+    :param: processes: Number of worker processes. The configs are validated in the
+                       current process if it is not greater than 1.
+    :param: chunk_size: Number of configs sent to a worker process at a time
+
+    :return: The result of every config, and the number of errors per attribute
+    """
+    chunks = _chunks(configs, chunk_size)
+    if processes and processes > 1:
+        with ProcessPoolExecutor(processes) as executor:
+            outcomes = list(
+                itertools.chain.from_iterable(
+                    executor.map(_validate_chunk, itertools.repeat(model), chunks)
+                )
+            )
+    else:
+        outcomes = [
+            outcome for chunk in chunks for outcome in _validate_chunk(model, chunk)
+        ]
+    results = []
+    error_counts = Counter()
+    for values, errors in outcomes:
+        error = None
+        if errors:
+            error_counts.update(errors)
+            error = ValidationError(
+                exceptions=[AttributeError(name, message) for name, message in errors]
+            )
+        results.append(ValidationResult(values, error))
+    attribute_errors = {}
+    for (name, message), count in sorted(error_counts.items()):
+        attribute_errors.setdefault(name, {})[message] = count
+    return BatchValidationReport(results, attribute_errors)
+
+
+def _compile_checker(attr_type) -> Callable[[Any], None]:
+    """Get a function that checks the type of a non-None value"""
+    type_to_check = _safe_get_type(attr_type)
+    args_type = _safe_get_args(attr_type)
+
+    if isinstance(type_to_check, type):
+        if not args_type:
+            return _instance_checker(type_to_check)
+        elif issubclass(type_to_check, dict):
+            if len(args_type) == 2:
+                return _dict_checker(type_to_check, *args_type)
+        elif issubclass(type_to_check, Iterable) and len(args_type) == 1:
+            return _items_checker(type_to_check, *args_type)
+    return lambda data_value: _validate(data_value, type_to_check, args_type)
+
+
+def _instance_checker(type_to_check):
+    def check(data_value):
+        if not isinstance(data_value, type_to_check):
+            raise Exception(AttributeErrorTypes.INVALID_TYPE)
+
+    return check
+
+
+def _dict_checker(type_to_check, key_type, value_type):
+    def check(data_value):
+        if not isinstance(data_value, type_to_check) or not all(
+            type(k) is key_type and type(v) is value_type for k, v in data_value.items()
+        ):
+            raise Exception(AttributeErrorTypes.INVALID_TYPE)
+
+    return check
+
+
+def _items_checker(type_to_check, item_type):
+    def check(data_value):
+        if not isinstance(data_value, type_to_check) or not all(
+            type(v) is item_type for v in data_value
+        ):
+            raise Exception(AttributeErrorTypes.INVALID_TYPE)
+
+    return check
+
+
 def _safe_get_type(obj_type):
     if _is_optional_type(obj_type):
         return _safe_get_type(obj_type.__args__[0])
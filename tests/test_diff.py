@@ -0,0 +1,115 @@
+import copy
+import unittest
+
+from opslib.osm.diff import diff_pod_specs, flatten_pod_spec
+
+
+POD_SPEC = {
+    "version": 3,
+    "containers": [
+        {
+            "name": "nbi",
+            "imageDetails": {"imagePath": "opensourcemano/nbi:latest"},
+            "ports": [{"name": "nbi", "containerPort": 9999, "protocol": "TCP"}],
+            "envConfig": {"OSMNBI_SERVER_ENABLE": True},
+            "volumeConfig": [
+                {
+                    "name": "config",
+                    "mountPath": "/etc/nbi",
+                    "files": [{"path": "nbi.cfg", "content": "[global]\n"}],
+                }
+            ],
+        }
+    ],
+    "kubernetesResources": {
+        "ingressResources": [
+            {
+                "name": "nbi-ingress",
+                "annotations": {"nginx.ingress.kubernetes.io/proxy-body-size": "0"},
+                "spec": {"rules": []},
+            }
+        ],
+        "secrets": [],
+    },
+}
+
+
+class TestFlattenPodSpec(unittest.TestCase):
+    def test_paths(self):
+        flat = flatten_pod_spec(POD_SPEC)
+        self.assertIn('containers[name="nbi"].envConfig.OSMNBI_SERVER_ENABLE', flat)
+        self.assertIn(
+            'containers[name="nbi"].volumeConfig[name="config"]'
+            '.files[path="nbi.cfg"].content',
+            flat,
+        )
+        self.assertIn(
+            'kubernetesResources.ingressResources[name="nbi-ingress"]'
+            '.annotations["nginx.ingress.kubernetes.io/proxy-body-size"]',
+            flat,
+        )
+        self.assertIn("kubernetesResources.secrets", flat)
+        self.assertNotIn("[global]", "".join(flat.values()))
+
+    def test_secrets(self):
+        pod_spec = copy.deepcopy(POD_SPEC)
+        secret = {"name": "db", "type": "Opaque", "stringData": {"password": "admin"}}
+        pod_spec["kubernetesResources"]["secrets"].append(secret)
+        pod_spec["containers"][0]["envConfig"]["DB_PASSWORD"] = "admin"
+        flat = flatten_pod_spec(pod_spec, b"key")
+        # One digest per secret, and the digests are keyed
+        self.assertIn('kubernetesResources.secrets[name="db"]', flat)
+        self.assertFalse(any("password" in path for path in flat))
+        password_path = 'containers[name="nbi"].envConfig.DB_PASSWORD'
+        self.assertNotEqual(
+            flat[password_path], flatten_pod_spec(pod_spec)[password_path]
+        )
+        self.assertEqual(flat, flatten_pod_spec(pod_spec, b"key"))
+
+    def test_duplicate_names(self):
+        flat = flatten_pod_spec({"ports": [{"name": "a"}, {"name": "a"}]})
+        self.assertEqual(list(flat), ['ports[name="a"].name', "ports[1].name"])
+
+
+class TestDiffPodSpecs(unittest.TestCase):
+    def test_no_changes(self):
+        diff = diff_pod_specs(
+            flatten_pod_spec(POD_SPEC), flatten_pod_spec(copy.deepcopy(POD_SPEC))
+        )
+        self.assertFalse(diff)
+        self.assertEqual(diff.summary(), "no changes")
+
+    def test_metadata_changes(self):
+        pod_spec = copy.deepcopy(POD_SPEC)
+        ingress = pod_spec["kubernetesResources"]["ingressResources"][0]
+        ingress["annotations"]["nginx.ingress.kubernetes.io/proxy-body-size"] = "10m"
+        ingress["annotations"]["kubernetes.io/ingress.class"] = "public"
+        diff = diff_pod_specs(flatten_pod_spec(POD_SPEC), flatten_pod_spec(pod_spec))
+        self.assertTrue(diff)
+        self.assertEqual(len(diff.added), 1)
+        self.assertEqual(len(diff.changed), 1)
+        self.assertFalse(diff.forces_restart)
+
+    def test_restart_changes(self):
+        pod_spec = copy.deepcopy(POD_SPEC)
+        container = pod_spec["containers"][0]
+        container["imageDetails"]["imagePath"] = "opensourcemano/nbi:testing"
+        del container["envConfig"]["OSMNBI_SERVER_ENABLE"]
+        diff = diff_pod_specs(flatten_pod_spec(POD_SPEC), flatten_pod_spec(pod_spec))
+        self.assertEqual(
+            diff.changed, ['containers[name="nbi"].imageDetails.imagePath']
+        )
+        self.assertEqual(
+            diff.removed, ['containers[name="nbi"].envConfig.OSMNBI_SERVER_ENABLE']
+        )
+        self.assertEqual(diff.added, ['containers[name="nbi"].envConfig'])
+        self.assertTrue(diff.forces_restart)
+        self.assertIn("changed: ", diff.summary())
+
+    def test_summary_truncated(self):
+        diff = diff_pod_specs({}, {f"path{i}": "" for i in range(12)})
+        self.assertTrue(diff.summary(max_paths=10).endswith("and 2 more"))
+
+
+if __name__ == "__main__":
+    unittest.main()
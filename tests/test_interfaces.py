@@ -0,0 +1,339 @@
+import unittest
+
+import mock
+from opslib.osm.interfaces.common import RelationPrefetcher
+from opslib.osm.interfaces.keystone import KeystoneClient, KeystoneServer
+from opslib.osm.interfaces.mysql import MysqlClient
+from opslib.osm.interfaces.prometheus import PrometheusScrapeTarget
+from ops.charm import CharmBase
+from ops.framework import EventBase, EventSource, ObjectEvents
+from ops.testing import Harness
+
+
+METADATA = """
+name: test
+requires:
+  keystone:
+    interface: keystone
+  mysql:
+    interface: mysql
+provides:
+  keystone-server:
+    interface: keystone
+  prometheus-scrape:
+    interface: prometheus
+"""
+
+KEYSTONE_DATA = {field: f"{field}-value" for field in KeystoneClient.mandatory_fields}
+
+
+class ClientsCharm(CharmBase):
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.keystone_client = KeystoneClient(self, "keystone")
+        self.mysql_client = MysqlClient(self, "mysql")
+        self.keystone_server = KeystoneServer(self, "keystone-server")
+        self.prometheus_scrape = PrometheusScrapeTarget(self, "prometheus-scrape")
+
+
+class TestBaseRelationClient(unittest.TestCase):
+    def setUp(self):
+        self.harness = Harness(ClientsCharm, meta=METADATA)
+        self.harness.begin()
+
+    def test_no_relation(self):
+        client = self.harness.charm.keystone_client
+        self.assertTrue(client.is_missing_data_in_app())
+        self.assertIsNone(client.host)
+
+    def count_relation_gets(self, read):
+        """Count the relation-get calls made by read, in a new hook"""
+        # The ops model loads every bag once, so drop its cache like a new hook does
+        self.harness.framework.model.relations._invalidate("keystone")
+        client = self.harness.charm.keystone_client
+        client.invalidate_snapshot()
+        client._update_relation()
+        backend = self.harness._backend
+        with mock.patch.object(
+            backend, "relation_get", wraps=backend.relation_get
+        ) as relation_get:
+            read(client)
+        return relation_get.call_count
+
+    def test_snapshot_reads(self):
+        relation_id = self.harness.add_relation("keystone", "keystone")
+        self.harness.add_relation_unit(relation_id, "keystone/0")
+        self.harness.update_relation_data(relation_id, "keystone", KEYSTONE_DATA)
+
+        def read_without_snapshot(client):
+            # How the client read the data before the snapshots
+            relation = client.relation
+            self.assertTrue(all(relation.data[relation.app].get(f) for f in KEYSTONE_DATA))
+            for field, value in KEYSTONE_DATA.items():
+                self.assertEqual(relation.data[relation.app].get(field), value)
+            for unit in relation.units:
+                relation.data[unit].get("host")
+
+        def read_with_snapshot(client):
+            client.relation_data_reads = 0
+            snapshot = client.get_snapshot()
+            self.assertTrue(all(snapshot.get_data_from_app(f) for f in KEYSTONE_DATA))
+            for field, value in KEYSTONE_DATA.items():
+                self.assertEqual(snapshot.get_data_from_app(field), value)
+            snapshot.get_data_from_unit("host")
+            # Every bag is looked up once in the ops model
+            self.assertEqual(client.relation_data_reads, 2)
+
+        # The ops model already loads every bag lazily, once: the snapshot saves
+        # lookups in the model, not relation-get calls.
+        self.assertEqual(self.count_relation_gets(read_without_snapshot), 2)
+        self.assertEqual(self.count_relation_gets(read_with_snapshot), 2)
+
+        snapshot = self.harness.charm.keystone_client.get_snapshot()
+        with self.assertRaises(TypeError):
+            snapshot.app_data["host"] = "other-host"
+
+    def test_snapshot_invalidation(self):
+        relation_id = self.harness.add_relation("mysql", "mysql")
+        self.harness.add_relation_unit(relation_id, "mysql/0")
+        client = self.harness.charm.mysql_client
+        self.assertTrue(client.is_missing_data_in_unit())
+
+        self.harness.update_relation_data(
+            relation_id,
+            "mysql/0",
+            {
+                "host": "mysql",
+                "port": "3306",
+                "user": "user",
+                "password": "password",
+                "root_password": "root_password",
+            },
+        )
+        self.assertFalse(client.is_missing_data_in_unit())
+        self.assertEqual(client.host, "mysql")
+
+
+class ObserverFirstCharm(CharmBase):
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.hosts = []
+        # Observed before the client observes the relation events
+        self.framework.observe(self.on["mysql"].relation_changed, self._read_host)
+        self.framework.observe(self.on.config_changed, self._read_host)
+        self.mysql_client = MysqlClient(self, "mysql")
+
+    def _read_host(self, _):
+        self.hosts.append(self.mysql_client.host)
+
+
+class TestRelationClientObserverOrder(unittest.TestCase):
+    def test_charm_observer_first(self):
+        harness = Harness(ObserverFirstCharm, meta=METADATA)
+        harness.begin()
+        relation_id = harness.add_relation("mysql", "mysql")
+        harness.add_relation_unit(relation_id, "mysql/0")
+        harness.update_relation_data(relation_id, "mysql/0", {"host": "h1"})
+        harness.charm.on.config_changed.emit()
+        harness.update_relation_data(relation_id, "mysql/0", {"host": "h2"})
+        self.assertEqual(harness.charm.hosts, ["h1", "h1", "h2"])
+
+
+MYSQL_DATA = {
+    "host": "mysql",
+    "port": "3306",
+    "user": "user",
+    "password": "password",
+    "root_password": "root_password",
+}
+
+
+class EventsCharm(ClientsCharm):
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.events = []
+        client_events = self.mysql_client.client_events
+        for event in (client_events.ready, client_events.changed, client_events.broken):
+            self.framework.observe(event, self._on_mysql_event)
+
+    def _on_mysql_event(self, event):
+        self.events.append((type(event).__name__, getattr(event, "fields", None)))
+
+
+class TestRelationClientEvents(unittest.TestCase):
+    def setUp(self):
+        self.harness = Harness(EventsCharm, meta=METADATA)
+        self.harness.begin()
+        self.relation_id = self.harness.add_relation("mysql", "mysql")
+        self.harness.add_relation_unit(self.relation_id, "mysql/0")
+        self.events = self.harness.charm.events
+
+    def test_ready_when_mandatory_data_is_complete(self):
+        self.harness.update_relation_data(
+            self.relation_id, "mysql/0", {"host": "mysql"}
+        )
+        self.assertEqual(self.events, [])
+        self.harness.update_relation_data(self.relation_id, "mysql/0", MYSQL_DATA)
+        self.assertEqual(self.events, [("RelationClientReadyEvent", None)])
+
+    def test_changed_only_for_tracked_fields(self):
+        self.harness.update_relation_data(self.relation_id, "mysql/0", MYSQL_DATA)
+        del self.events[:]
+        self.harness.update_relation_data(
+            self.relation_id, "mysql/0", {"unrelated": "value"}
+        )
+        self.assertEqual(self.events, [])
+        self.harness.update_relation_data(
+            self.relation_id, "mysql/0", {"host": "mariadb", "port": "3307"}
+        )
+        self.assertEqual(
+            self.events, [("RelationClientChangedEvent", ["host", "port"])]
+        )
+
+    def test_broken(self):
+        self.harness.update_relation_data(self.relation_id, "mysql/0", MYSQL_DATA)
+        del self.events[:]
+        self.harness.update_relation_data(self.relation_id, "mysql/0", {"host": ""})
+        self.assertEqual(self.events, [("RelationClientBrokenEvent", None)])
+        self.harness.update_relation_data(self.relation_id, "mysql/0", MYSQL_DATA)
+        relation = self.harness.model.get_relation("mysql", self.relation_id)
+        self.harness.charm.on["mysql"].relation_broken.emit(relation)
+        self.assertEqual(
+            self.events,
+            [
+                ("RelationClientBrokenEvent", None),
+                ("RelationClientReadyEvent", None),
+                ("RelationClientBrokenEvent", None),
+            ],
+        )
+
+
+class MysqlClientEvents(ObjectEvents):
+    custom = EventSource(EventBase)
+
+
+class CustomMysqlClient(MysqlClient):
+    on = MysqlClientEvents()
+
+
+class CustomEventsCharm(CharmBase):
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.hosts = []
+        self.framework.observe(self.on["mysql"].relation_changed, self._read_host)
+        self.mysql_client = CustomMysqlClient(self, "mysql")
+        self.framework.observe(self.mysql_client.client_events.ready, self._read_host)
+
+    def _read_host(self, _):
+        self.hosts.append(self.mysql_client.host)
+
+
+class TestRelationClientCustomEvents(unittest.TestCase):
+    def test_subclass_events(self):
+        harness = Harness(CustomEventsCharm, meta=METADATA)
+        harness.begin()
+        relation_id = harness.add_relation("mysql", "mysql")
+        harness.add_relation_unit(relation_id, "mysql/0")
+        harness.update_relation_data(relation_id, "mysql/0", MYSQL_DATA)
+        # Read on relation-changed, before the client checks the fields, and on ready
+        self.assertEqual(harness.charm.hosts, ["mysql", "mysql"])
+
+
+class PrefetchCharm(CharmBase):
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.relation_prefetcher = RelationPrefetcher(self)
+        self.keystone_client = KeystoneClient(self, "keystone")
+        self.mysql_client = MysqlClient(self, "mysql")
+
+
+class TestRelationPrefetcher(unittest.TestCase):
+    def setUp(self):
+        self.harness = Harness(PrefetchCharm, meta=METADATA)
+        self.harness.begin()
+        self.keystone_id = self.harness.add_relation("keystone", "keystone")
+        self.harness.add_relation_unit(self.keystone_id, "keystone/0")
+        self.harness.update_relation_data(self.keystone_id, "keystone", KEYSTONE_DATA)
+        self.mysql_id = self.harness.add_relation("mysql", "mysql")
+        for unit in range(3):
+            self.harness.add_relation_unit(self.mysql_id, f"mysql/{unit}")
+        self.harness.update_relation_data(self.mysql_id, "mysql/2", {"host": "mysql"})
+
+    def test_prefetch(self):
+        prefetcher = self.harness.charm.relation_prefetcher
+        keystone_client = self.harness.charm.keystone_client
+        mysql_client = self.harness.charm.mysql_client
+        # The data was read to check the fields on relation-changed; start a new hook
+        for relation_name in ("keystone", "mysql"):
+            self.harness.framework.model.relations._invalidate(relation_name)
+            prefetcher.invalidate(relation_name)
+        prefetcher.relation_data_reads = 0
+        backend = self.harness._backend
+        with mock.patch.object(
+            backend, "relation_get", wraps=backend.relation_get
+        ) as relation_get:
+            self.assertEqual(keystone_client.host, KEYSTONE_DATA["host"])
+            # The application and unit bags of both relations are read at once
+            self.assertEqual(prefetcher.relation_data_reads, 6)
+            self.assertEqual(relation_get.call_count, 6)
+            # The clients are served by the ops model, which keeps the bags
+            self.assertEqual(mysql_client.host, "mysql")
+            self.assertFalse(keystone_client.is_missing_data_in_app())
+            self.assertEqual(prefetcher.relation_data_reads, 6)
+            self.assertEqual(relation_get.call_count, 6)
+
+    def test_relation_changed(self):
+        mysql_client = self.harness.charm.mysql_client
+        self.assertEqual(mysql_client.host, "mysql")
+        self.harness.update_relation_data(self.mysql_id, "mysql/2", {"host": "mariadb"})
+        self.assertEqual(mysql_client.host, "mariadb")
+        self.assertEqual(
+            len(self.harness.charm.relation_prefetcher.get_snapshots("mysql")), 1
+        )
+
+
+class TestBaseRelationProvider(unittest.TestCase):
+    def setUp(self):
+        self.harness = Harness(ClientsCharm, meta=METADATA)
+        self.harness.set_leader(is_leader=True)
+        self.harness.begin()
+
+    def test_publish_only_changes(self):
+        relation_ids = [
+            self.harness.add_relation("keystone-server", f"nbi{i}") for i in range(2)
+        ]
+        server = self.harness.charm.keystone_server
+        self.assertEqual(server.publish_info(**KEYSTONE_DATA), 24)
+        self.assertEqual(server.publish_info(**KEYSTONE_DATA), 0)
+        self.assertEqual(server.publish_info(**{**KEYSTONE_DATA, "port": 5000}), 2)
+        for relation_id in relation_ids:
+            self.assertEqual(
+                self.harness.get_relation_data(relation_id, "test")["port"], "5000"
+            )
+
+    def test_publish_app_and_unit(self):
+        relation_id = self.harness.add_relation("prometheus-scrape", "prometheus")
+        target = self.harness.charm.prometheus_scrape
+        scrape_info = {
+            "hostname": "test",
+            "port": "9100",
+            "metrics_path": "/metrics",
+            "scrape_interval": "30s",
+            "scrape_timeout": "15s",
+        }
+        self.assertEqual(target.publish_info(**scrape_info), 10)
+        self.assertEqual(target.publish_info(**scrape_info), 0)
+        self.assertEqual(
+            self.harness.get_relation_data(relation_id, "test/0"), scrape_info
+        )
+
+    def test_publish_non_leader(self):
+        self.harness.add_relation("keystone-server", "nbi")
+        self.harness.set_leader(is_leader=False)
+        self.assertEqual(
+            self.harness.charm.keystone_server.publish_info(**KEYSTONE_DATA), 0
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
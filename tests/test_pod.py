@@ -1,12 +1,16 @@
 import unittest
 
+import yaml
 from opslib.osm.pod import (
     IngressResourceV3Builder,
     FilesV3Builder,
     ContainerV3Builder,
     PodRestartPolicy,
+    index_kubernetes_resources,
+    content_digest,
     PodSpecV3Builder,
 )
+from opslib.osm.utils import FrozenDict, hash_from_dict, spec_hash, thaw
 
 from typing import Optional, List, Dict, Tuple, Set
 
@@ -177,6 +181,341 @@ class TestPodSpecBuilder(unittest.TestCase):
             },
         )
 
+    def test_find_resource(self):
+        pod_spec_builder = PodSpecV3Builder()
+        pod_spec_builder.add_secret("secret-name", {"key": "value"})
+        pod_spec_builder.add_secret("secret-name", {"key": "other-value"})
+        pod_spec_builder.add_ingress_resource({"name": "ingress", "spec": {}})
+        self.assertEqual(
+            pod_spec_builder.find_resource("secrets", "secret-name")["stringData"],
+            {"key": "other-value"},
+        )
+        self.assertIsNone(pod_spec_builder.find_resource("secrets", "ingress"))
+        pod_spec_builder.add_secret("new-secret", {"key": "value"})
+        self.assertIsNotNone(pod_spec_builder.find_resource("secrets", "new-secret"))
+
+    def test_build_is_yaml_serializable(self):
+        container_builder = ContainerV3Builder("app", {"imagePath": "image"})
+        container_builder.add_port("http", 80)
+        ingress_resource_builder = IngressResourceV3Builder("app-ingress", {})
+        ingress_resource_builder.add_rule("app.local", "app", 80)
+        pod_spec_builder = PodSpecV3Builder()
+        pod_spec_builder.add_container(container_builder.build())
+        pod_spec_builder.add_ingress_resource(ingress_resource_builder.build())
+        pod_spec_builder.add_secret("secret", {"key": "value"})
+        pod_spec = pod_spec_builder.build()
+        # ops writes the pod spec with the C safe dumper, if available
+        dumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+        self.assertEqual(yaml.safe_load(yaml.dump(pod_spec, Dumper=dumper)), pod_spec)
+        self.assertEqual(yaml.safe_load(yaml.safe_dump(pod_spec)), pod_spec)
+
+    def test_policy_hash_is_ordered(self):
+        pod_spec_builder = PodSpecV3Builder()
+        for i in range(10):
+            pod_spec_builder.add_secret(f"secret-{i}", {"key": f"value-{i}"})
+        pod_spec = pod_spec_builder.build()
+        secret_names = [f"secret-{i}" for i in (7, 2, 5, 0)]
+        policy_hashes = set()
+        for names in (secret_names, secret_names[::-1], sorted(secret_names)):
+            restart_policy = PodRestartPolicy()
+            restart_policy.add_secrets(secret_names=names)
+            policy_hashes.add(restart_policy.policy_hash(pod_spec))
+        self.assertEqual(len(policy_hashes), 1)
+
+    def test_policy_hash_with_index(self):
+        pod_spec_builder = PodSpecV3Builder()
+        for i in range(10):
+            pod_spec_builder.add_secret(f"secret-{i}", {"key": f"value-{i}"})
+        pod_spec = pod_spec_builder.build()
+        restart_policy = PodRestartPolicy()
+        restart_policy.add_secrets(secret_names=["secret-2", "secret-5"])
+        self.assertEqual(
+            restart_policy.policy_hash(pod_spec),
+            restart_policy.policy_hash(pod_spec, index_kubernetes_resources(pod_spec)),
+        )
+        self.assertEqual(
+            restart_policy.policy_hash(pod_spec),
+            hash_from_dict(
+                {
+                    "kubernetesResources": {
+                        "secrets": [
+                            pod_spec_builder.find_resource("secrets", "secret-2"),
+                            pod_spec_builder.find_resource("secrets", "secret-5"),
+                        ]
+                    }
+                }
+            ),
+        )
+
+    def test_build_leaves_builder_untouched(self):
+        container_builder = ContainerV3Builder("app", {"imagePath": "image"})
+        container_builder.add_envs({"KEY": "value"})
+        pod_spec_builder = PodSpecV3Builder()
+        pod_spec_builder.add_container(container_builder.build())
+        pod_spec_builder.add_secret("secret-name", {"key": "value"})
+        restart_policy = PodRestartPolicy()
+        restart_policy.add_secrets()
+        pod_spec_builder.set_restart_policy(restart_policy)
+
+        pod_spec = pod_spec_builder.build()
+        self.assertEqual(pod_spec, pod_spec_builder.build())
+        self.assertIn("policyHash", pod_spec["containers"][0]["envConfig"])
+        self.assertEqual(container_builder.env_config, {"KEY": "value"})
+        self.assertNotIn("policyHash", pod_spec_builder.containers[0]["envConfig"])
+        with self.assertRaises(TypeError):
+            pod_spec["containers"][0]["envConfig"]["KEY"] = "other-value"
+        with self.assertRaises(TypeError):
+            pod_spec["kubernetesResources"]["secrets"].append({})
+
+    def test_container_build_is_not_aliased(self):
+        container_builder = ContainerV3Builder("app", {"imagePath": "image"})
+        container_builder.add_port("http", 80)
+        container = container_builder.build()
+        container_builder.add_port("https", 443)
+        self.assertEqual(len(container["ports"]), 1)
+        self.assertEqual(len(container_builder.build()["ports"]), 2)
+
+    def test_shared_files(self):
+        files_builder = FilesV3Builder()
+        files_builder.add_file("ca.crt", "certificate")
+        files_builder.add_file("config.yaml", "key: value\n", mode=0o600)
+        files = files_builder.build()
+        pod_spec_builder = PodSpecV3Builder()
+        config_map_name = pod_spec_builder.add_shared_files(files)
+        for name in ("nbi", "lcm"):
+            container_builder = ContainerV3Builder(name, {"imagePath": name})
+            container_builder.add_config_map_volume_config(
+                "shared", "/app/shared", config_map_name, files
+            )
+            pod_spec_builder.add_container(container_builder.build())
+        pod_spec = pod_spec_builder.build()
+
+        self.assertEqual(
+            pod_spec["configMaps"],
+            {
+                config_map_name: {
+                    content_digest("certificate"): "certificate",
+                    content_digest("key: value\n"): "key: value\n",
+                }
+            },
+        )
+        for container in pod_spec["containers"]:
+            self.assertEqual(
+                container["volumeConfig"],
+                [
+                    {
+                        "name": "shared",
+                        "mountPath": "/app/shared",
+                        "configMap": {
+                            "name": config_map_name,
+                            "files": [
+                                {"key": content_digest("certificate"), "path": "ca.crt"},
+                                {
+                                    "key": content_digest("key: value\n"),
+                                    "path": "config.yaml",
+                                    "mode": 0o600,
+                                },
+                            ],
+                        },
+                    }
+                ],
+            )
+
+    def test_shared_files_secret(self):
+        files_builder = FilesV3Builder()
+        files_builder.add_file("password", "password", secret=True)
+        with self.assertRaises(ValueError):
+            PodSpecV3Builder().add_shared_files(files_builder.build())
+
+    def test_no_config_maps(self):
+        self.assertNotIn("configMaps", PodSpecV3Builder().build())
+
+
+class TestIngressResourceV3Builder(unittest.TestCase):
+    def test_rules_merged_by_host(self):
+        ingress_resource_builder = IngressResourceV3Builder("osm-ingress", {})
+        ingress_resource_builder.add_rule("osm.local", "ui", 80)
+        ingress_resource_builder.add_rules(
+            "osm.local", [("nbi", 9999, "/osm", "Prefix"), ("grafana", 3000, "/grafana")]
+        )
+        ingress_resource_builder.add_rule("prometheus.local", "prometheus", 9090)
+        ingress_resource_builder.add_rule("osm.local", "nbi", 9998, "/osm", "Prefix")
+        self.assertEqual(
+            ingress_resource_builder.build()["spec"]["rules"],
+            [
+                {
+                    "host": "osm.local",
+                    "http": {
+                        "paths": [
+                            {
+                                "path": "/",
+                                "backend": {"serviceName": "ui", "servicePort": 80},
+                            },
+                            {
+                                "path": "/grafana",
+                                "backend": {"serviceName": "grafana", "servicePort": 3000},
+                            },
+                            {
+                                "path": "/osm",
+                                "backend": {"serviceName": "nbi", "servicePort": 9998},
+                                "pathType": "Prefix",
+                            },
+                        ]
+                    },
+                },
+                {
+                    "host": "prometheus.local",
+                    "http": {
+                        "paths": [
+                            {
+                                "path": "/",
+                                "backend": {"serviceName": "prometheus", "servicePort": 9090},
+                            }
+                        ]
+                    },
+                },
+            ],
+        )
+
+    def test_tls_hosts_deduplicated(self):
+        ingress_resource_builder = IngressResourceV3Builder("osm-ingress", {})
+        ingress_resource_builder.add_tls(["b.local", "a.local"], "tls-1")
+        ingress_resource_builder.add_tls(["a.local", "c.local"], "tls-1")
+        ingress_resource_builder.add_tls(["b.local"], "tls-0")
+        self.assertEqual(
+            ingress_resource_builder.build()["spec"]["tls"],
+            [
+                {"hosts": ["b.local"], "secretName": "tls-0"},
+                {"hosts": ["a.local", "c.local"], "secretName": "tls-1"},
+            ],
+        )
+
+    def test_canonical_order(self):
+        ingress_resources = []
+        rules = [
+            (host, path) for host in ("a.local", "b.local") for path in ("/ui", "/osm")
+        ]
+        for ordered_rules in (rules, rules[::-1]):
+            ingress_resource_builder = IngressResourceV3Builder("osm-ingress", {})
+            for host, path in ordered_rules:
+                ingress_resource_builder.add_tls([host], f"{host}-tls")
+                ingress_resource_builder.add_rule(host, "osm", 80, path)
+            ingress_resources.append(ingress_resource_builder.build())
+        self.assertEqual(spec_hash(ingress_resources[0]), spec_hash(ingress_resources[1]))
+        self.assertEqual(ingress_resources[0], ingress_resources[1])
+
+
+class TestContainerV3Builder(unittest.TestCase):
+    def test_bulk_add(self):
+        container_builder = ContainerV3Builder("app", {"imagePath": "image"})
+        container_builder.add_envs({"A": "1", "B": "2"})
+        container_builder.add_envs([("C", "3"), ("A", "4")])
+        container_builder.add_secret_envs("secret", {"D": "key"})
+        container_builder.add_ports([("http", 80), ("udp", 53, "UDP")])
+        container = container_builder.build()
+        self.assertEqual(
+            container["envConfig"],
+            {"A": "4", "B": "2", "C": "3", "D": {"secret": {"name": "secret", "key": "key"}}},
+        )
+        self.assertEqual(list(container["envConfig"]), ["A", "B", "C", "D"])
+        self.assertEqual(
+            container["ports"],
+            [
+                {"name": "http", "containerPort": 80, "protocol": "TCP"},
+                {"name": "udp", "containerPort": 53, "protocol": "UDP"},
+            ],
+        )
+        self.assertFalse(hasattr(container_builder, "__dict__"))
+
+    def test_build_is_cached(self):
+        container_builder = ContainerV3Builder("app", {"imagePath": "image"})
+        container_builder.add_port("http", 80)
+        container_builder.add_env("A", "1")
+        container_builder.add_http_readiness_probe("/health", 80)
+        container = container_builder.build()
+        fingerprint = container_builder.fingerprint
+        self.assertIs(container_builder.build(), container)
+        self.assertEqual(fingerprint, spec_hash(thaw(container)))
+
+        container_builder.add_env("B", "2")
+        other_container = container_builder.build()
+        self.assertIsNot(other_container, container)
+        self.assertNotEqual(container_builder.fingerprint, fingerprint)
+        # The unchanged parts are reused
+        self.assertIs(other_container["ports"], container["ports"])
+        self.assertIs(
+            other_container["kubernetes"]["readinessProbe"],
+            container["kubernetes"]["readinessProbe"],
+        )
+        self.assertEqual(container_builder.fingerprint, spec_hash(thaw(other_container)))
+
+    def test_parts_changed_after_build(self):
+        container_builder = ContainerV3Builder("app", {"imagePath": "image"})
+        ports = container_builder.ports
+        security_context = container_builder.security_context
+        container_builder.build()
+        ports.append({"name": "http", "containerPort": 80, "protocol": "TCP"})
+        security_context["privileged"] = True
+        container = container_builder.build()
+        self.assertEqual(container["ports"][0]["containerPort"], 80)
+        self.assertTrue(container["kubernetes"]["securityContext"]["privileged"])
+        self.assertIs(container_builder.build(), container)
+
+    def test_changes_through_properties(self):
+        container_builder = ContainerV3Builder("app", {"imagePath": "image"})
+        container = container_builder.build()
+        container_builder.env_config["A"] = "1"
+        container_builder.security_context["privileged"] = True
+        container_builder.image_pull_policy = "IfNotPresent"
+        other_container = container_builder.build()
+        self.assertEqual(other_container["envConfig"], {"A": "1"})
+        self.assertTrue(other_container["kubernetes"]["securityContext"]["privileged"])
+        self.assertEqual(other_container["imagePullPolicy"], "IfNotPresent")
+        self.assertEqual(container["envConfig"], {})
+
+
+class TestFilesV3Builder(unittest.TestCase):
+    def test_frozen_files(self):
+        files_builder = FilesV3Builder()
+        files_builder.add_file("config.yaml", "key: value\n", mode=0o644)
+        files = files_builder.build()
+        self.assertEqual(
+            files, [{"path": "config.yaml", "content": "key: value\n", "mode": 0o644}]
+        )
+        self.assertIsInstance(files[0], FrozenDict)
+        with self.assertRaises(TypeError):
+            files[0]["content"] = "key: other value\n"
+
+    def test_interned_files(self):
+        builders = [FilesV3Builder(), FilesV3Builder()]
+        for files_builder in builders:
+            files_builder.add_file("dashboard.json", "".join(["{", "}"]), mode=0o644)
+        files, other_files = (files_builder.build() for files_builder in builders)
+        self.assertIs(files[0], other_files[0])
+
+    def test_add_template_file(self):
+        files_builder = FilesV3Builder()
+        for _ in range(2):
+            files_builder.add_template_file(
+                "config.yaml", "port: $port\n", {"port": 9999}, mode=0o644
+            )
+        files = files_builder.build()
+        self.assertEqual(
+            files[0], {"path": "config.yaml", "content": "port: 9999\n", "mode": 0o644}
+        )
+        self.assertIs(files[0], files[1])
+
+    def test_add_files(self):
+        files_builder = FilesV3Builder()
+        files_builder.add_files([("a.yaml", "a: 1\n"), ("b.sh", "#!/bin/sh\n", 0o755)])
+        self.assertEqual(
+            files_builder.build(),
+            [
+                {"path": "a.yaml", "content": "a: 1\n"},
+                {"path": "b.sh", "content": "#!/bin/sh\n", "mode": 0o755},
+            ],
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
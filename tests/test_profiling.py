@@ -0,0 +1,39 @@
+import pstats
+import tempfile
+import unittest
+
+from opslib.osm.profiling import HookProfiler, parse_profile_modes
+
+
+class TestProfiling(unittest.TestCase):
+    def test_parse_profile_modes(self):
+        self.assertEqual(parse_profile_modes(None), set())
+        self.assertEqual(parse_profile_modes("false"), set())
+        self.assertEqual(parse_profile_modes("cpu"), {"cpu"})
+        self.assertEqual(parse_profile_modes("CPU, memory"), {"cpu", "memory"})
+        self.assertEqual(parse_profile_modes("all"), {"cpu", "memory"})
+
+    def test_profiles(self):
+        with tempfile.TemporaryDirectory() as directory:
+            profiler = HookProfiler(directory, {"cpu", "memory"})
+            profiler.start()
+            sorted(str(i) for i in range(1000))
+            pstats_path, allocations_path = profiler.stop("config-changed")
+            self.assertTrue(pstats_path.name.endswith("-config-changed.pstats"))
+            pstats.Stats(str(pstats_path))
+            self.assertIn("allocation sites", allocations_path.read_text())
+            self.assertEqual(profiler.profiles(), [allocations_path, pstats_path])
+
+    def test_rotation(self):
+        with tempfile.TemporaryDirectory() as directory:
+            profiler = HookProfiler(directory, {"cpu"}, max_profiles=2)
+            for hook in ("hook-c", "hook-b", "hook-a"):
+                profiler.start()
+                profiler.stop(hook)
+            profiles = [path.name for path in profiler.profiles()]
+            self.assertEqual(len(profiles), 2)
+            self.assertFalse(any("hook-c" in name for name in profiles))
+
+
+if __name__ == "__main__":
+    unittest.main()
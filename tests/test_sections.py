@@ -0,0 +1,46 @@
+import os
+from pathlib import Path
+import tempfile
+import unittest
+
+from opslib.osm.sections import SectionCache
+
+
+class TestSectionCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.cache = SectionCache(Path(self.directory.name) / ".sections")
+
+    def test_get(self):
+        self.assertIsNone(self.cache.get("files", "digest"))
+        self.assertTrue(self.cache.put("files", "digest", [{"path": "a.conf"}]))
+        self.assertEqual(self.cache.get("files", "digest")[0]["path"], "a.conf")
+        self.assertIsNone(self.cache.get("files", "other"))
+        self.cache.discard(["files"])
+        self.assertIsNone(self.cache.get("files", "digest"))
+
+    def test_put_not_serializable(self):
+        self.assertFalse(self.cache.put("files", "digest", {"path": object()}))
+        self.assertIsNone(self.cache.get("files", "digest"))
+
+    def test_put_without_directory(self):
+        cache = SectionCache(Path(self.directory.name) / "missing" / ".sections")
+        self.assertFalse(cache.put("files", "digest", []))
+        self.assertFalse((Path(self.directory.name) / "missing").exists())
+
+    def test_max_size(self):
+        self.cache.max_size = 150
+        self.assertFalse(self.cache.put("big", "digest", "x" * 200))
+        self.assertTrue(self.cache.put("first", "digest", "x" * 60))
+        first_path = next(self.cache.directory.glob("*.json"))
+        os.utime(first_path, ns=(0, 0))
+        self.assertTrue(self.cache.put("second", "digest", "x" * 60))
+        # The oldest result is removed
+        self.assertIsNone(self.cache.get("first", "digest"))
+        self.assertIsNotNone(self.cache.get("second", "digest"))
+
+    def test_clear(self):
+        self.cache.put("app/files", "digest", [])
+        self.cache.clear()
+        self.assertEqual(list(self.cache.directory.iterdir()), [])
@@ -0,0 +1,45 @@
+import unittest
+
+from opslib.osm.pod import ContainerV3Builder, FilesV3Builder, PodSpecV3Builder
+from opslib.osm.sizing import (
+    check_pod_spec_size,
+    measure_pod_spec,
+    SizeBudget,
+)
+
+
+def build_pod_spec(file_size: int):
+    files_builder = FilesV3Builder()
+    files_builder.add_file("dashboard.json", "x" * file_size)
+    pod_spec_builder = PodSpecV3Builder()
+    for name in ("grafana", "sidecar"):
+        container_builder = ContainerV3Builder(name, {"imagePath": name})
+        container_builder.add_volume_config(
+            "dashboards", "/dashboards", files_builder.build()
+        )
+        pod_spec_builder.add_container(container_builder.build())
+    pod_spec_builder.add_secret("secret", {"key": "value"})
+    return pod_spec_builder.build()
+
+
+class TestSizing(unittest.TestCase):
+    def test_measure_pod_spec(self):
+        size = measure_pod_spec(build_pod_spec(1000))
+        self.assertEqual(set(size.containers), {"grafana", "sidecar"})
+        self.assertEqual(size.files["grafana/dashboards/dashboard.json"], 1000)
+        self.assertGreater(size.volumes["grafana/dashboards"], 1000)
+        self.assertGreater(size.total, 2000)
+        self.assertIn("secret", size.secrets)
+        self.assertEqual(size.config_maps, {})
+        self.assertIn("largest: grafana", size.summary())
+
+    def test_check_pod_spec_size(self):
+        size = measure_pod_spec(build_pod_spec(1000))
+        self.assertEqual(check_pod_spec_size(size, SizeBudget()), [])
+        warnings = check_pod_spec_size(size, SizeBudget(max_total=2000, max_file=500))
+        self.assertEqual(len(warnings), 3)
+        self.assertTrue(warnings[0].startswith("pod spec is"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,30 @@
+import unittest
+
+from opslib.osm.templates import compile_template, render_template
+
+
+class TestTemplates(unittest.TestCase):
+    def test_compile_template(self):
+        source = "listen: $port\n"
+        self.assertIs(compile_template(source), compile_template(source))
+
+    def test_render_template(self):
+        source = "host: $host\nport: $port\n"
+        content = render_template(source, {"host": "mysql", "port": 3306})
+        self.assertEqual(content, "host: mysql\nport: 3306\n")
+        self.assertIs(render_template(source, {"port": 3306, "host": "mysql"}), content)
+        self.assertEqual(
+            render_template(source, {"host": "mariadb", "port": 3306}),
+            "host: mariadb\nport: 3306\n",
+        )
+
+    def test_render_template_unhashable_variables(self):
+        self.assertEqual(render_template("$value", {"value": object}), str(object))
+
+    def test_render_template_missing_variable(self):
+        with self.assertRaises(KeyError):
+            render_template("$host:$port", {"host": "mysql"})
+
+
+if __name__ == "__main__":
+    unittest.main()
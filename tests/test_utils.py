@@ -0,0 +1,143 @@
+import copy
+import unittest
+
+import yaml
+from opslib.osm.utils import (
+    freeze,
+    FrozenDict,
+    FrozenList,
+    find_in_list_with_key,
+    hash_from_dict,
+    index_list_by_key,
+    spec_hash,
+    SPEC_HASH_PREFIX,
+    thaw,
+)
+
+
+POD_SPEC = {
+    "version": 3,
+    "containers": [
+        {
+            "name": "c1",
+            "ports": [{"name": "http", "containerPort": 80, "protocol": "TCP"}],
+            "envConfig": {"A": "1", "B": True, "C": 1.5, "D": None},
+            "volumeConfig": [
+                {
+                    "name": "config",
+                    "mountPath": "/etc/config",
+                    "files": [{"path": "config.yaml", "content": "key: value\n"}],
+                }
+            ],
+        }
+    ],
+}
+
+
+class TestSpecHash(unittest.TestCase):
+    def test_prefix(self):
+        self.assertTrue(spec_hash(POD_SPEC).startswith(SPEC_HASH_PREFIX))
+        self.assertNotEqual(spec_hash(POD_SPEC), hash_from_dict(POD_SPEC))
+
+    def test_stable(self):
+        reordered = {key: POD_SPEC[key] for key in reversed(list(POD_SPEC))}
+        self.assertEqual(spec_hash(POD_SPEC), spec_hash(reordered))
+        self.assertEqual(spec_hash(POD_SPEC), spec_hash(copy.deepcopy(POD_SPEC)))
+
+    def test_changes(self):
+        pod_spec = copy.deepcopy(POD_SPEC)
+        pod_spec["containers"][0]["envConfig"]["A"] = 1
+        self.assertNotEqual(spec_hash(POD_SPEC), spec_hash(pod_spec))
+        pod_spec["containers"][0]["envConfig"]["A"] = True
+        self.assertNotEqual(spec_hash(POD_SPEC), spec_hash(pod_spec))
+
+    def test_ambiguous_strings(self):
+        self.assertNotEqual(spec_hash(["ab", "c"]), spec_hash(["a", "bc"]))
+        self.assertNotEqual(spec_hash({"a": "b"}), spec_hash({"ab": ""}))
+
+    def test_shared_fragments(self):
+        files = [{"path": "config.yaml", "content": "key: value\n"}]
+        shared = {"a": files, "b": files}
+        copied = {"a": files, "b": copy.deepcopy(files)}
+        self.assertEqual(spec_hash(shared), spec_hash(copied))
+
+    def test_frozen(self):
+        frozen_pod_spec = freeze(POD_SPEC)
+        self.assertEqual(spec_hash(POD_SPEC), spec_hash(frozen_pod_spec))
+        self.assertIsNotNone(frozen_pod_spec._spec_digest)
+        self.assertEqual(spec_hash(POD_SPEC), spec_hash(frozen_pod_spec))
+
+    def test_unsupported_type(self):
+        with self.assertRaises(TypeError):
+            spec_hash({"key": object()})
+
+
+class TestFrozen(unittest.TestCase):
+    def test_freeze(self):
+        frozen_pod_spec = freeze(POD_SPEC)
+        self.assertEqual(frozen_pod_spec, POD_SPEC)
+        self.assertIsInstance(frozen_pod_spec, FrozenDict)
+        self.assertIsInstance(frozen_pod_spec["containers"], FrozenList)
+        self.assertIsInstance(frozen_pod_spec["containers"][0], FrozenDict)
+        self.assertIs(freeze(frozen_pod_spec), frozen_pod_spec)
+        self.assertEqual(hash_from_dict(frozen_pod_spec), hash_from_dict(POD_SPEC))
+
+    def test_immutable(self):
+        frozen_pod_spec = freeze(POD_SPEC)
+        with self.assertRaises(TypeError):
+            frozen_pod_spec["version"] = 4
+        with self.assertRaises(TypeError):
+            frozen_pod_spec.pop("version")
+        with self.assertRaises(TypeError):
+            frozen_pod_spec["containers"].append({})
+        with self.assertRaises(TypeError):
+            frozen_pod_spec["containers"][0]["envConfig"].update({"A": "2"})
+
+    def test_thaw(self):
+        pod_spec = thaw(freeze(POD_SPEC))
+        self.assertEqual(pod_spec, POD_SPEC)
+        self.assertIs(type(pod_spec), dict)
+        self.assertIs(type(pod_spec["containers"]), list)
+        self.assertIs(type(pod_spec["containers"][0]["envConfig"]), dict)
+
+    def test_copy(self):
+        frozen_pod_spec = freeze(POD_SPEC)
+        self.assertEqual(copy.deepcopy(frozen_pod_spec), POD_SPEC)
+        self.assertIsInstance(copy.copy(frozen_pod_spec), FrozenDict)
+
+
+    def test_yaml_dump(self):
+        frozen_pod_spec = freeze(POD_SPEC)
+        dumpers = [yaml.SafeDumper]
+        if hasattr(yaml, "CSafeDumper"):
+            dumpers.append(yaml.CSafeDumper)
+        for dumper in dumpers:
+            self.assertEqual(
+                yaml.dump(frozen_pod_spec, Dumper=dumper),
+                yaml.dump(POD_SPEC, Dumper=dumper),
+            )
+        self.assertEqual(yaml.safe_load(yaml.safe_dump(frozen_pod_spec)), POD_SPEC)
+
+
+class TestListLookups(unittest.TestCase):
+    items = [
+        {"name": "a", "value": 1},
+        {"value": 2},
+        {"name": "b", "value": 3},
+        {"name": "a", "value": 4},
+    ]
+
+    def test_find_in_list_with_key(self):
+        self.assertEqual(find_in_list_with_key(self.items, "name", "a")["value"], 4)
+        self.assertEqual(find_in_list_with_key(self.items, "name", "b")["value"], 3)
+        self.assertIsNone(find_in_list_with_key(self.items, "name", "c"))
+
+    def test_index_list_by_key(self):
+        index = index_list_by_key(self.items, "name")
+        self.assertEqual(list(index), ["a", "b"])
+        for name, item in index.items():
+            self.assertIs(item, find_in_list_with_key(self.items, "name", name))
+
+
+if __name__ == "__main__":
+    unittest.main()
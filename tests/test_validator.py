@@ -2,8 +2,11 @@ import unittest
 
 from opslib.osm.validator import (
     ModelValidator,
+    ROOT_ATTRIBUTE,
     ValidationError,
     AttributeErrorTypes,
+    schema_version,
+    validate_batch,
     validator,
 )
 from typing import Optional, List, Dict, Tuple, Set
@@ -149,3 +152,94 @@ class TestValidator(unittest.TestCase):
 
     def test_missing_optional_attr(self):
         ExampleMissingOptionalAttribute(**{})
+
+    def test_compiled_schema(self):
+        schema = {attribute.name: attribute for attribute in ExampleModel.__schema__}
+        self.assertEqual(list(schema), list(ExampleModel.__annotations__))
+        self.assertFalse(schema["boolean"].optional)
+        self.assertTrue(schema["opt_boolean"].optional)
+        custom_schema = ExampleCustomValidationModel.__schema__
+        self.assertIsNotNone(custom_schema[0].validator)
+
+    def test_construct(self):
+        model = ExampleCustomValidationModel.construct(log_level="WARNING")
+        self.assertIsInstance(model, ExampleCustomValidationModel)
+        self.assertEqual(model.log_level, "WARNING")
+
+    def test_schema_version(self):
+        class Model(ModelValidator):
+            log_level: str
+
+        version = schema_version(Model)
+        self.assertEqual(version, schema_version(Model))
+        self.assertNotEqual(version, schema_version(ExampleCustomValidationModel))
+
+        class Model(ModelValidator):
+            log_level: Optional[str]
+
+        self.assertNotEqual(version, schema_version(Model))
+
+    def test_exact_item_types(self):
+        data = {attr: VALUES[attr] for attr in MANDATORY_ATTRS}
+        wrong_values = {
+            "list_int": [1, True],
+            "tuple_attr": (1, "2"),
+            "set_attr": {1, 2.0},
+            "dict_str_int": {"1": 1, "2": False},
+            "dict_int_str": {1: "1", "2": "2"},
+        }
+        for key, wrong_value in wrong_values.items():
+            with self.assertRaises(ValidationError) as e:
+                ExampleModel(**{**data, key: wrong_value})
+            self.assertEqual(
+                e.exception.attribute_errors, {key: AttributeErrorTypes.INVALID_TYPE}
+            )
+
+    def test_validate_batch(self):
+        configs = [
+            {"log_level": "INFO"},
+            {"log-level": "DEBUG"},
+            {"log_level": "WRONG"},
+            {},
+            {"log_level": "WRONG"},
+        ]
+        report = validate_batch(ExampleCustomValidationModel, iter(configs), chunk_size=2)
+        self.assertEqual((report.total, report.valid, report.invalid), (5, 2, 3))
+        self.assertEqual(report.results[1].values, {"log_level": "DEBUG"})
+        self.assertTrue(report.results[0].valid)
+        self.assertEqual(
+            report.results[2].error.attribute_errors,
+            {"log_level": "value must be INFO or DEBUG"},
+        )
+        self.assertEqual(
+            report.attribute_errors,
+            {
+                "log_level": {
+                    AttributeErrorTypes.MISSING: 1,
+                    "value must be INFO or DEBUG": 2,
+                }
+            },
+        )
+        self.assertEqual(configs[1], {"log-level": "DEBUG"})
+
+    def test_validate_batch_not_mappings(self):
+        configs = [None, {"log_level": "INFO"}, ["log_level"], {1: "INFO"}]
+        report = validate_batch(ExampleCustomValidationModel, configs)
+        self.assertEqual([r.valid for r in report.results], [False, True, False, False])
+        self.assertEqual(
+            report.results[0].error.attribute_errors,
+            {ROOT_ATTRIBUTE: AttributeErrorTypes.INVALID_TYPE},
+        )
+        self.assertEqual(
+            report.attribute_errors[ROOT_ATTRIBUTE], {AttributeErrorTypes.INVALID_TYPE: 2}
+        )
+
+    def test_validate_batch_processes(self):
+        data = {attr: VALUES[attr] for attr in MANDATORY_ATTRS}
+        configs = [data, {**data, "integer": "2"}] * 3
+        report = validate_batch(ExampleModel, configs, processes=2, chunk_size=2)
+        self.assertEqual([result.valid for result in report.results], [True, False] * 3)
+        self.assertEqual(report.results[0].values["list_int"], [1, 2])
+        self.assertEqual(
+            report.attribute_errors, {"integer": {AttributeErrorTypes.INVALID_TYPE: 3}}
+        )